@@ -5,8 +5,8 @@ mkdir -p logs
 TEMP_CRON=$(mktemp)
 
 cat > "$TEMP_CRON" << 'EOF'
-0 2 * * * cd /home/amh1124/Projects/sf-data-pipelines && .venv/bin/python -m sf_data_pipelines covariance-matrix > logs/covariance_matrix.log 2>&1
-0 2 * * * cd /home/amh1124/Projects/sf-data-pipelines && .venv/bin/python -m sf_data_pipelines barra update --database production > logs/production_database.log 2>&1
+0 2 * * * cd /home/amh1124/Projects/sf-data-pipelines && .venv/bin/python -m sf_data_pipelines barra update --database production > logs/production_database.log 2>&1; .venv/bin/python -m sf_data_pipelines covariance-matrix --database production > logs/covariance_matrix.log 2>&1
+0 4 * * * cd /home/amh1124/Projects/sf-data-pipelines && .venv/bin/python -m sf_data_pipelines crsp update --database production > logs/crsp.log 2>&1; .venv/bin/python -m sf_data_pipelines ftse update --database production > logs/ftse.log 2>&1; .venv/bin/python -m sf_data_pipelines table compact --database production > logs/compact.log 2>&1
 EOF
 
 crontab "$TEMP_CRON"
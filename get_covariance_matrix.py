@@ -1,7 +1,6 @@
-import sf_quant.data as sfd
 import datetime as dt
 from rich import print
-import polars as pl
+from sf_data_pipelines.covariance_matrix_flow import subset_covariance_matrix
 
 grad_fund_tickers = sorted(
     [
@@ -35,28 +34,10 @@ grad_fund_tickers = sorted(
 
 date_ = dt.date(2025, 9, 15)
 
-assets = sfd.load_assets_by_date(
-    date_=date_, in_universe=True, columns=["barrid", "ticker", "cusip"]
-).sort("ticker")
-
-print(assets)
-
-barrids = assets["barrid"].to_list()
-tickers = assets["ticker"].to_list()
-
-mapping = {barrid: ticker for barrid, ticker in zip(barrids, tickers)}
-
-cov_mat = sfd.construct_covariance_matrix(date_=date_, barrids=barrids)
-
-print(cov_mat)
-
-cov_mat_with_tickers = (
-    cov_mat.rename({"barrid": "ticker", **mapping})
-    .with_columns(pl.col("ticker").replace(mapping))
-    .filter(pl.col("ticker").is_in(grad_fund_tickers))
-    .select("ticker", *sorted(grad_fund_tickers))
-    .sort("ticker")
-)
+# Only the rows of the requested tickers are used, so this takes milliseconds
+cov_mat_with_tickers = subset_covariance_matrix(
+    date_=date_, tickers=grad_fund_tickers
+).drop("date")
 
 print(cov_mat_with_tickers)
 
@@ -1,19 +1,50 @@
 import click
 import datetime as dt
+import numpy as np
+import polars as pl
 from sf_data_pipelines.all_pipelines import (
     barra_backfill_pipeline,
     ftse_backfill_pipeline,
     crsp_backfill_pipeline,
+    ftse_update_pipeline,
+    crsp_update_pipeline,
     covariance_matrix_pipeline,
+    covariance_matrix_backfill_pipeline,
     barra_daily_pipeline,
+    barra_cache_warm_pipeline,
     # strategy_backfill_pipeline
 )
-from sf_data_pipelines.utils.enums import DatabaseName
+from sf_data_pipelines.covariance_matrix_flow import subset_covariance_matrix
+from sf_data_pipelines.utils.enums import (
+    CovarianceOutput,
+    CovarianceStorage,
+    DatabaseName,
+    Executor,
+    Partitioning,
+)
 from sf_data_pipelines.utils.tables import Database
+from sf_data_pipelines.utils.cache import MemberCache
 
 # Valid options
 VALID_DATABASES = ["research", "production", "development"]
 PIPELINE_TYPES = ["backfill", "update"]
+EXECUTORS = [executor.value for executor in Executor]
+PARTITIONINGS = [partitioning.value for partitioning in Partitioning]
+COVARIANCE_OUTPUTS = [output.value for output in CovarianceOutput]
+COVARIANCE_STORAGES = [storage.value for storage in CovarianceStorage]
+TABLES = [
+    "assets",
+    "exposures",
+    "covariances",
+    "packed_covariances",
+    "crsp_events",
+    "crsp_monthly",
+    "crsp_daily",
+    "factors",
+    "signals",
+    "active_weights",
+    "composite_alphas",
+]
 
 
 @click.group()
@@ -46,7 +77,56 @@ def cli():
     show_default=True,
     help="End date (YYYY-MM-DD).",
 )
-def barra(pipeline_type, database, start, end):
+@click.option(
+    "--workers",
+    type=int,
+    default=None,
+    help="Number of workers used to read zip files (defaults to the pool default).",
+)
+@click.option(
+    "--executor",
+    type=click.Choice(EXECUTORS, case_sensitive=False),
+    default=Executor.THREAD.value,
+    show_default=True,
+    help="Run extraction workers on threads or processes.",
+)
+@click.option(
+    "--lookback",
+    type=int,
+    default=None,
+    help="Reload the last N market dates on update, even if already loaded.",
+)
+@click.option(
+    "--materialize-ids/--no-materialize-ids",
+    default=True,
+    show_default=True,
+    help="Also copy tickers, CUSIPs and identities into the assets table.",
+)
+@click.option(
+    "--covariance-storage",
+    type=click.Choice(COVARIANCE_STORAGES, case_sensitive=False),
+    default=CovarianceStorage.FULL.value,
+    show_default=True,
+    help="Store factor covariances as full pivots or packed upper triangles.",
+)
+@click.option(
+    "--exposures-tensor",
+    is_flag=True,
+    default=False,
+    help="Build the memory-mapped exposures store (kept up to date once built).",
+)
+def barra(
+    pipeline_type,
+    database,
+    start,
+    end,
+    workers,
+    executor,
+    lookback,
+    materialize_ids,
+    covariance_storage,
+    exposures_tensor,
+):
     match pipeline_type:
         case "backfill":
             start = start.date() if hasattr(start, "date") else start
@@ -57,7 +137,16 @@ def barra(pipeline_type, database, start, end):
             database_name = DatabaseName(database)
             database_instance = Database(database_name)
 
-            barra_backfill_pipeline(start, end, database_instance)
+            barra_backfill_pipeline(
+                start,
+                end,
+                database_instance,
+                workers,
+                Executor(executor),
+                materialize_ids,
+                CovarianceStorage(covariance_storage),
+                exposures_tensor,
+            )
 
         case "update":
             click.echo(f"Running update for {database} database.")
@@ -65,15 +154,20 @@ def barra(pipeline_type, database, start, end):
             database_name = DatabaseName(database)
             database_instance = Database(database_name)
 
-            barra_daily_pipeline(database_instance)
+            barra_daily_pipeline(
+                database_instance,
+                lookback,
+                workers,
+                Executor(executor),
+                materialize_ids,
+                CovarianceStorage(covariance_storage),
+                exposures_tensor,
+            )
 
 
 @cli.command()
 @click.argument(
-    "pipeline_type",
-    type=click.Choice(
-        ["backfill"], case_sensitive=False
-    ),  # Update is currently not supported
+    "pipeline_type", type=click.Choice(PIPELINE_TYPES, case_sensitive=False)
 )
 @click.option(
     "--database",
@@ -95,7 +189,14 @@ def barra(pipeline_type, database, start, end):
     show_default=True,
     help="End date (YYYY-MM-DD).",
 )
-def crsp(pipeline_type, database, start, end):
+@click.option(
+    "--workers",
+    type=int,
+    default=2,
+    show_default=True,
+    help="Yearly CRSP daily queries in flight at once on backfill.",
+)
+def crsp(pipeline_type, database, start, end, workers):
     match pipeline_type:
         case "backfill":
             start = start.date() if hasattr(start, "date") else start
@@ -106,15 +207,20 @@ def crsp(pipeline_type, database, start, end):
             database_name = DatabaseName(database)
             database_instance = Database(database_name)
 
-            crsp_backfill_pipeline(start, end, database_instance)
+            crsp_backfill_pipeline(start, end, database_instance, workers)
+
+        case "update":
+            click.echo(f"Running crsp update for {database} database.")
+
+            database_name = DatabaseName(database)
+            database_instance = Database(database_name)
+
+            crsp_update_pipeline(database_instance)
 
 
 @cli.command()
 @click.argument(
-    "pipeline_type",
-    type=click.Choice(
-        ["backfill"], case_sensitive=False
-    ),  # Update is currently not supported
+    "pipeline_type", type=click.Choice(PIPELINE_TYPES, case_sensitive=False)
 )
 @click.option(
     "--database",
@@ -149,11 +255,303 @@ def ftse(pipeline_type, database, start, end):
 
             ftse_backfill_pipeline(start, end, database_instance)
 
+        case "update":
+            click.echo(f"Running ftse update for {database} database.")
+
+            database_name = DatabaseName(database)
+            database_instance = Database(database_name)
+
+            ftse_update_pipeline(database_instance)
+
+
+@cli.command()
+@click.argument("action", type=click.Choice(["warm", "prune"], case_sensitive=False))
+@click.option(
+    "--start",
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+    default=str(dt.date(1995, 7, 31)),
+    show_default=True,
+    help="Start date of the history files to warm (YYYY-MM-DD).",
+)
+@click.option(
+    "--end",
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+    default=str(dt.date.today()),
+    show_default=True,
+    help="End date of the history files to warm (YYYY-MM-DD).",
+)
+@click.option(
+    "--max-gb",
+    type=float,
+    default=None,
+    help="Size to prune the cache down to (defaults to BARRA_CACHE_MAX_GB).",
+)
+@click.option(
+    "--workers",
+    type=int,
+    default=None,
+    help="Number of workers used to read zip files (defaults to the pool default).",
+)
+@click.option(
+    "--executor",
+    type=click.Choice(EXECUTORS, case_sensitive=False),
+    default=Executor.THREAD.value,
+    show_default=True,
+    help="Run extraction workers on threads or processes.",
+)
+def cache(action, start, end, max_gb, workers, executor):
+    member_cache = MemberCache()
+
+    if not member_cache.enabled:
+        click.echo("Barra member cache is disabled (set BARRA_CACHE_DIR to enable it).")
+        return
+
+    match action:
+        case "warm":
+            start = start.date() if hasattr(start, "date") else start
+            end = end.date() if hasattr(end, "date") else end
+
+            click.echo(f"Warming barra member cache from {start} to {end}.")
+
+            barra_cache_warm_pipeline(start, end, workers, Executor(executor))
+
+        case "prune":
+            max_bytes = int(max_gb * 1024**3) if max_gb is not None else None
+            removed = member_cache.prune(max_bytes)
+
+            click.echo(f"Removed {removed} cache entries.")
+
+    click.echo(f"Cache size: {member_cache.size() / 1024**3:.2f} GB.")
+
 
 @cli.command()
-def covariance_matrix():
+@click.argument(
+    "action", type=click.Choice(["repartition", "compact"], case_sensitive=False)
+)
+@click.option(
+    "--database",
+    type=click.Choice(VALID_DATABASES, case_sensitive=False),
+    required=True,
+    help="Target database (research or database).",
+)
+@click.option(
+    "--table",
+    "table_name",
+    type=click.Choice(TABLES, case_sensitive=False),
+    default=None,
+    help="Table to rewrite (compact defaults to every table).",
+)
+@click.option(
+    "--partitioning",
+    type=click.Choice(PARTITIONINGS, case_sensitive=False),
+    default=None,
+    help="Layout to repartition the table into.",
+)
+def table(action, database, table_name, partitioning):
+    database_instance = Database(DatabaseName(database))
+
+    match action:
+        case "repartition":
+            if table_name is None or partitioning is None:
+                raise click.UsageError(
+                    "repartition requires --table and --partitioning."
+                )
+
+            click.echo(
+                f"Repartitioning '{table_name}' on '{database}' by {partitioning}."
+            )
+            database_instance.table(table_name).repartition(Partitioning(partitioning))
+
+        case "compact":
+            # Only date partitioned tables have daily partitions to fold
+            for name in [table_name] if table_name is not None else TABLES:
+                click.echo(f"Compacting '{name}' on '{database}'.")
+                database_instance.table(name).compact()
+
+
+@cli.command()
+@click.argument(
+    "action", type=click.Choice(["show", "refresh"], case_sensitive=False)
+)
+@click.option(
+    "--database",
+    type=click.Choice(VALID_DATABASES, case_sensitive=False),
+    required=True,
+    help="Target database (research or database).",
+)
+@click.option(
+    "--table",
+    "table_name",
+    type=click.Choice(TABLES, case_sensitive=False),
+    default=None,
+    help="Show or refresh a single table (defaults to every table).",
+)
+def catalog(action, database, table_name):
+    database_instance = Database(DatabaseName(database))
+    table_names = [table_name] if table_name is not None else TABLES
+
+    match action:
+        case "show":
+            with pl.Config(tbl_rows=-1, tbl_cols=-1):
+                if table_name is not None:
+                    click.echo(database_instance.table(table_name).catalog())
+                else:
+                    click.echo(database_instance.catalog.summary())
+
+        case "refresh":
+            for name in table_names:
+                click.echo(f"Refreshing the catalog of '{name}' on '{database}'.")
+                database_instance.table(name).refresh_catalog()
+
+
+@cli.command()
+@click.argument(
+    "pipeline_type",
+    type=click.Choice(PIPELINE_TYPES, case_sensitive=False),
+    default="update",
+    required=False,
+)
+@click.option(
+    "--output",
+    type=click.Choice(COVARIANCE_OUTPUTS, case_sensitive=False),
+    default=CovarianceOutput.DENSE.value,
+    show_default=True,
+    help="Publish the dense matrix or the factor model components.",
+)
+@click.option(
+    "--float32/--float64",
+    default=False,
+    show_default=True,
+    help="Precision of the dense matrix.",
+)
+@click.option(
+    "--memory-gb",
+    type=float,
+    default=2,
+    show_default=True,
+    help="Memory budget for building the dense matrix (per worker in backfills).",
+)
+@click.option(
+    "--tickers",
+    default=None,
+    help="Comma separated tickers to compute a subset matrix for instead.",
+)
+@click.option(
+    "--barrids",
+    default=None,
+    help="Comma separated barrids to compute a subset matrix for instead.",
+)
+@click.option(
+    "--date",
+    "date_",
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+    default=None,
+    help="Date of the subset matrix (defaults to the last market date).",
+)
+@click.option(
+    "--out",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="Write the subset matrix to a .csv or .parquet file.",
+)
+@click.option(
+    "--database",
+    type=click.Choice(VALID_DATABASES, case_sensitive=False),
+    default=None,
+    help="Read inputs from this database, falling back to the vendor files.",
+)
+@click.option(
+    "--start",
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+    default=str(dt.date(1995, 7, 31)),
+    show_default=True,
+    help="Start date of a backfill (YYYY-MM-DD).",
+)
+@click.option(
+    "--end",
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+    default=str(dt.date.today()),
+    show_default=True,
+    help="End date of a backfill (YYYY-MM-DD).",
+)
+@click.option(
+    "--workers",
+    type=int,
+    default=None,
+    help="Processes building dates in parallel during a backfill.",
+)
+@click.option(
+    "--optimizer-factors/--no-optimizer-factors",
+    default=False,
+    show_default=True,
+    help="Also write the Cholesky of F, L'X' and sqrt(D) for optimizers.",
+)
+def covariance_matrix(
+    pipeline_type,
+    output,
+    float32,
+    memory_gb,
+    tickers,
+    barrids,
+    date_,
+    out,
+    database,
+    start,
+    end,
+    workers,
+    optimizer_factors,
+):
+    database_instance = Database(DatabaseName(database)) if database else None
+    dtype = np.float32 if float32 else np.float64
+    max_bytes = int(memory_gb * 1024**3)
+
+    if pipeline_type == "backfill":
+        if database_instance is None:
+            raise click.UsageError("backfill requires --database.")
+
+        click.echo(
+            f"Running covariance matrix backfill on '{database}' "
+            f"from {start.date()} to {end.date()}."
+        )
+        covariance_matrix_backfill_pipeline(
+            start.date(),
+            end.date(),
+            database_instance,
+            CovarianceOutput(output),
+            dtype,
+            max_bytes,
+            workers,
+            optimizer_factors,
+        )
+        click.echo("Backfill completed successfully!")
+        return
+
+    if tickers is not None or barrids is not None:
+        covariance_matrix_df = subset_covariance_matrix(
+            date_=date_.date() if date_ is not None else None,
+            tickers=tickers.split(",") if tickers is not None else None,
+            barrids=barrids.split(",") if barrids is not None else None,
+            database=database_instance,
+        )
+
+        if out is None:
+            with pl.Config(tbl_rows=-1, tbl_cols=-1):
+                click.echo(covariance_matrix_df)
+        elif out.endswith(".csv"):
+            covariance_matrix_df.write_csv(out)
+        else:
+            covariance_matrix_df.write_parquet(out)
+
+        return
+
     click.echo(f"Running covariance matrix daily flow: {dt.date.today()}.")
-    covariance_matrix_pipeline()
+    covariance_matrix_pipeline(
+        CovarianceOutput(output),
+        dtype,
+        max_bytes,
+        database_instance,
+        optimizer_factors,
+    )
     click.echo("Flow completed successfully!")
 
 
@@ -11,82 +11,386 @@ from sf_data_pipelines.barra_cusips_flow import barra_cusips_daily_flow
 from sf_data_pipelines.barra_tickers_flow import barra_tickers_daily_flow
 from sf_data_pipelines.barra_returns_flow import barra_returns_daily_flow, barra_returns_history_flow
 from sf_data_pipelines.barra_risk_flow import barra_risk_daily_flow, barra_risk_history_flow
-from sf_data_pipelines.ftse_russell_flow import ftse_russell_backfill_flow
+from sf_data_pipelines import (
+    barra_covariances_flow,
+    barra_exposures_flow,
+    barra_returns_flow,
+    barra_risk_flow,
+    barra_specific_returns,
+    barra_volume_flow,
+)
+from sf_data_pipelines.ftse_russell_flow import (
+    ftse_russell_backfill_flow,
+    ftse_russell_update_flow,
+)
 from sf_data_pipelines.barra_specific_returns import (
     barra_specific_returns_daily_flow,
     barra_specific_returns_history_flow,
 )
 from sf_data_pipelines.barra_volume_flow import barra_volume_history_flow, barra_volume_daily_flow
-from sf_data_pipelines.crsp_daily_flow import crsp_daily_backfill_flow
-from sf_data_pipelines.crsp_monthly_flow import crsp_monthly_backfill_flow
-from sf_data_pipelines.crsp_events_flow import crsp_events_backfill_flow
+from sf_data_pipelines.crsp_daily_flow import (
+    crsp_daily_backfill_flow,
+    crsp_daily_update_flow,
+)
+from sf_data_pipelines.crsp_monthly_flow import (
+    crsp_monthly_backfill_flow,
+    crsp_monthly_update_flow,
+)
+from sf_data_pipelines.crsp_events_flow import (
+    crsp_events_backfill_flow,
+    crsp_events_update_flow,
+)
 from sf_data_pipelines.barra_factors_flow import barra_factors_daily_flow
-from sf_data_pipelines.covariance_matrix_flow import covariance_matrix_daily_flow
+from sf_data_pipelines.covariance_matrix_flow import (
+    covariance_matrix_backfill_flow,
+    covariance_matrix_daily_flow,
+)
 import datetime as dt
-from sf_data_pipelines.utils.tables import Database
+import numpy as np
+from tqdm import tqdm
+from sf_data_pipelines.utils.tables import Database, TableBuilder
+from sf_data_pipelines.utils.enums import (
+    CovarianceOutput,
+    CovarianceStorage,
+    Executor,
+)
+from sf_data_pipelines.utils import get_last_market_date
+from sf_data_pipelines.utils.cache import MemberCache
+from sf_data_pipelines.utils.ingestion import DailyIngestion
+from sf_data_pipelines.utils.wrds_reader import WrdsReader, shared_wrds_reader
+from sf_data_pipelines.utils.barra_datasets import (
+    barra_assets,
+    barra_covariances,
+    barra_exposures,
+    barra_factors,
+    barra_ids,
+    barra_returns,
+    barra_risk,
+    barra_specific_returns,
+    barra_volume,
+)
+
+# Datasets read for every recent market date
+barra_daily_datasets = [
+    barra_returns,
+    barra_specific_returns,
+    barra_risk,
+    barra_volume,
+    barra_exposures,
+    barra_covariances,
+]
+
+# Datasets that only update asset rows loaded by barra_returns
+barra_update_datasets = [barra_specific_returns, barra_risk, barra_volume]
+
+# Datasets read for the latest market date only
+barra_latest_datasets = [barra_factors]
+id_mappings_datasets = [barra_ids, barra_assets]
+
+
+def barra_daily_ingestion(
+    database: Database | None = None,
+    include_id_mappings: bool = False,
+    lookback: int | None = None,
+    workers: int | None = None,
+    executor: Executor = Executor.THREAD,
+) -> DailyIngestion:
+    """
+    Read the recent daily Barra files for the daily flows.
+
+    With a database, only files missing from its ingestion manifest are read.
+    A `lookback` reloads every file of the last `lookback` market dates
+    instead, which repairs dates that were loaded incorrectly.
+    """
+    ingestion = DailyIngestion(
+        get_last_market_date(n_days=lookback or 60),
+        workers,
+        executor,
+        manifest=database.ingestion_manifest if database else None,
+        reload=lookback is not None,
+    )
+
+    for dataset in barra_daily_datasets:
+        target = (
+            database.assets_table
+            if database is not None and dataset in barra_update_datasets
+            else None
+        )
+        ingestion.register(dataset, target=target)
+
+    latest_datasets = barra_latest_datasets + (
+        id_mappings_datasets if include_id_mappings else []
+    )
+    for dataset in latest_datasets:
+        ingestion.register(dataset, latest_only=True)
 
+    ingestion.run()
+
+    return ingestion
+
+
+def barra_daily_flow(
+    database: Database,
+    ingestion: DailyIngestion | None = None,
+    assets_builder: TableBuilder | None = None,
+    covariance_storage: CovarianceStorage = CovarianceStorage.FULL,
+    exposures_tensor: bool = False,
+) -> None:
+    builder = assets_builder or TableBuilder(database.assets_table)
+    daily_ingestion = ingestion or barra_daily_ingestion(database)
 
-def barra_daily_flow(database: Database) -> None:
     # Assets table
-    barra_returns_daily_flow(database)
-    barra_specific_returns_daily_flow(database)
-    barra_risk_daily_flow(database)
-    barra_volume_daily_flow(database)
+    barra_returns_daily_flow(database, daily_ingestion.pop(barra_returns), builder)
+    barra_specific_returns_daily_flow(
+        database, daily_ingestion.pop(barra_specific_returns), builder
+    )
+    barra_risk_daily_flow(database, daily_ingestion.pop(barra_risk), builder)
+    barra_volume_daily_flow(database, daily_ingestion.pop(barra_volume), builder)
 
     # Covariance Matrix Components
-    barra_exposures_daily_flow(database)
-    barra_covariances_daily_flow(database)
+    barra_exposures_daily_flow(
+        database, daily_ingestion.pop(barra_exposures), exposures_tensor
+    )
+    barra_covariances_daily_flow(
+        database, daily_ingestion.pop(barra_covariances), covariance_storage
+    )
 
     # Factors
-    barra_factors_daily_flow(database)
+    barra_factors_daily_flow(database, daily_ingestion.pop(barra_factors))
+
+    if assets_builder is None:
+        builder.write()
+
+    if ingestion is None:
+        daily_ingestion.commit()
 
 
 def barra_history_flow(
-    start_date: dt.date, end_date: dt.date, database: Database
+    start_date: dt.date,
+    end_date: dt.date,
+    database: Database,
+    workers: int | None = None,
+    executor: Executor = Executor.THREAD,
+    covariance_storage: CovarianceStorage = CovarianceStorage.FULL,
+    exposures_tensor: bool = False,
+    assets_builder: TableBuilder | None = None,
 ) -> None:
-    # Assets table
-    barra_returns_history_flow(start_date, end_date, database)
-    barra_specific_returns_history_flow(start_date, end_date, database)
-    barra_risk_history_flow(start_date, end_date, database)
-    barra_volume_history_flow(start_date, end_date, database)
+    """
+    Backfill the Barra assets table and covariance matrix components.
+
+    Each year of the assets table is written once, together with any
+    operations already staged for it in `assets_builder`.
+    """
+    builder = assets_builder or TableBuilder(database.assets_table)
+    years = list(range(start_date.year, end_date.year + 1))
+
+    # Assets table, written once per year
+    for year in tqdm(years, desc="Barra Assets"):
+        year_start, year_end = dt.date(year, 1, 1), dt.date(year, 12, 31)
+
+        barra_returns_history_flow(
+            year_start, year_end, database, workers, executor, builder
+        )
+        barra_specific_returns_history_flow(
+            year_start, year_end, database, workers, executor, builder
+        )
+        barra_risk_history_flow(
+            year_start, year_end, database, workers, executor, builder
+        )
+        barra_volume_history_flow(
+            year_start, year_end, database, workers, executor, builder
+        )
+
+        builder.write([year])
+
+    if assets_builder is None:
+        builder.write()
 
     # Covariance Matrix Components
-    barra_exposures_history_flow(start_date, end_date, database)
-    barra_covariances_history_flow(start_date, end_date, database)
+    barra_exposures_history_flow(
+        start_date, end_date, database, workers, executor, exposures_tensor
+    )
+    barra_covariances_history_flow(
+        start_date, end_date, database, workers, executor, covariance_storage
+    )
+
+
+def id_mappings_flow(
+    database: Database,
+    ingestion: DailyIngestion | None = None,
+    assets_builder: TableBuilder | None = None,
+    refresh_years: list[int] | None = None,
+    materialize: bool = True,
+    refresh_dates: list[dt.date] | None = None,
+) -> None:
+    """
+    Write the ticker, CUSIP and asset identity interval tables.
 
+    With `materialize`, the attributes are also joined into the assets table.
+    Only years whose identity intervals changed since they were last
+    materialized are rewritten, plus `refresh_years`. `refresh_dates` should
+    cover the dates that just gained asset rows; only the files holding them
+    are rewritten.
+    """
+    builder = assets_builder or TableBuilder(database.assets_table)
 
-def id_mappings_flow(database: Database) -> None:
-    barra_tickers_daily_flow(database)
-    barra_cusips_daily_flow(database)
-    barra_assets_daily_flow(database)
+    if ingestion is None:
+        ids_df = assets_df = None
+    else:
+        ids_df = ingestion.pop(barra_ids)
+        assets_df = ingestion.pop(barra_assets)
+
+    for flow, raw_df in [
+        (barra_tickers_daily_flow, ids_df),
+        (barra_cusips_daily_flow, ids_df),
+        (barra_assets_daily_flow, assets_df),
+    ]:
+        flow(database, raw_df, builder, refresh_years, materialize, refresh_dates)
+
+    if assets_builder is None:
+        builder.write()
 
 
 def ftse_history_flow(
-    start_date: dt.date, end_date: dt.date, database: Database
+    start_date: dt.date,
+    end_date: dt.date,
+    database: Database,
+    reader: WrdsReader | None = None,
 ) -> None:
-    """Note: requires logging in to WRDS when running."""
-    ftse_russell_backfill_flow(start_date, end_date, database)
+    """Note: requires WRDS credentials (see `wrds_uri`) when running."""
+    reader = reader or shared_wrds_reader()
+    ftse_russell_backfill_flow(start_date, end_date, database, reader)
 
 
 def crsp_history_flow(
-    start_date: dt.date, end_date: dt.date, database: Database
+    start_date: dt.date,
+    end_date: dt.date,
+    database: Database,
+    reader: WrdsReader | None = None,
+    workers: int = 2,
+) -> None:
+    """Note: requires WRDS credentials (see `wrds_uri`) when running."""
+    reader = reader or shared_wrds_reader()
+    crsp_events_backfill_flow(start_date, end_date, database, reader)
+    crsp_monthly_backfill_flow(start_date, end_date, database, reader)
+    crsp_daily_backfill_flow(start_date, end_date, database, reader, workers)
+
+
+def ftse_update_flow(database: Database, reader: WrdsReader | None = None) -> None:
+    """Note: requires WRDS credentials (see `wrds_uri`) when running."""
+    reader = reader or shared_wrds_reader()
+    ftse_russell_update_flow(database, reader)
+
+
+def crsp_update_flow(database: Database, reader: WrdsReader | None = None) -> None:
+    """
+    Load the rows dated after each CRSP table's last stored date.
+
+    Note: requires WRDS credentials (see `wrds_uri`) when running.
+    """
+    reader = reader or shared_wrds_reader()
+    crsp_events_update_flow(database, reader)
+    crsp_monthly_update_flow(database, reader)
+    crsp_daily_update_flow(database, reader)
+
+
+def barra_daily_pipeline(
+    database: Database,
+    lookback: int | None = None,
+    workers: int | None = None,
+    executor: Executor = Executor.THREAD,
+    materialize_ids: bool = True,
+    covariance_storage: CovarianceStorage = CovarianceStorage.FULL,
+    exposures_tensor: bool = False,
 ) -> None:
-    """Note: requires logging in to WRDS when running."""
-    crsp_events_backfill_flow(start_date, end_date, database)
-    crsp_monthly_backfill_flow(start_date, end_date, database)
-    crsp_daily_backfill_flow(start_date, end_date, database)
+    # Open each daily zip folder once for every flow in the pipeline
+    ingestion = barra_daily_ingestion(
+        database,
+        include_id_mappings=True,
+        lookback=lookback,
+        workers=workers,
+        executor=executor,
+    )
 
+    # Collect every write to the assets table and apply them once per year
+    assets_builder = TableBuilder(database.assets_table)
 
-def barra_daily_pipeline(database: Database) -> None:
-    barra_daily_flow(database)
-    id_mappings_flow(database)
+    barra_daily_flow(
+        database, ingestion, assets_builder, covariance_storage, exposures_tensor
+    )
+    id_mappings_flow(
+        database,
+        ingestion,
+        assets_builder,
+        materialize=materialize_ids,
+        refresh_dates=assets_builder.upserted_dates(),
+    )
+
+    assets_builder.write()
+    ingestion.commit()
+
+    # Evict old cache entries once per run rather than after every read
+    MemberCache().prune()
 
 
 def barra_backfill_pipeline(
-    start_date: dt.date, end_date: dt.date, database: Database
+    start_date: dt.date,
+    end_date: dt.date,
+    database: Database,
+    workers: int | None = None,
+    executor: Executor = Executor.THREAD,
+    materialize_ids: bool = True,
+    covariance_storage: CovarianceStorage = CovarianceStorage.FULL,
+    exposures_tensor: bool = False,
+) -> None:
+    # The identity joins are staged first so each year is written only once
+    assets_builder = TableBuilder(database.assets_table)
+    id_mappings_flow(
+        database,
+        assets_builder=assets_builder,
+        refresh_years=list(range(start_date.year, end_date.year + 1)),
+        materialize=materialize_ids,
+    )
+    barra_history_flow(
+        start_date,
+        end_date,
+        database,
+        workers,
+        executor,
+        covariance_storage,
+        exposures_tensor,
+        assets_builder,
+    )
+    assets_builder.write()
+
+    MemberCache().prune()
+
+
+def barra_cache_warm_pipeline(
+    start_date: dt.date,
+    end_date: dt.date,
+    workers: int | None = None,
+    executor: Executor = Executor.THREAD,
 ) -> None:
-    barra_history_flow(start_date, end_date, database)
-    id_mappings_flow(database)
+    """Parse every history and recent daily member into the member cache."""
+    history_flows = [
+        barra_returns_flow,
+        barra_specific_returns,
+        barra_risk_flow,
+        barra_volume_flow,
+        barra_exposures_flow,
+        barra_covariances_flow,
+    ]
+
+    years = list(range(start_date.year, end_date.year + 1))
+
+    for year in tqdm(years, desc="Warming Barra Cache"):
+        for flow in history_flows:
+            flow.load_barra_history_files(year, workers, executor)
+
+    barra_daily_ingestion(include_id_mappings=True, workers=workers, executor=executor)
+
+    MemberCache().prune()
 
 
 def ftse_backfill_pipeline(
@@ -96,10 +400,48 @@ def ftse_backfill_pipeline(
 
 
 def crsp_backfill_pipeline(
-    start_date: dt.date, end_date: dt.date, database: Database
+    start_date: dt.date, end_date: dt.date, database: Database, workers: int = 2
 ) -> None:
-    crsp_history_flow(start_date, end_date, database)
+    crsp_history_flow(start_date, end_date, database, workers=workers)
 
 
-def covariance_matrix_pipeline() -> None:
-    covariance_matrix_daily_flow()
+def ftse_update_pipeline(database: Database) -> None:
+    ftse_update_flow(database)
+
+
+def crsp_update_pipeline(database: Database) -> None:
+    crsp_update_flow(database)
+
+
+def covariance_matrix_pipeline(
+    output: CovarianceOutput = CovarianceOutput.DENSE,
+    dtype: np.dtype = np.float64,
+    max_bytes: int = 2 * 1024**3,
+    database: Database | None = None,
+    optimizer_factors: bool = False,
+) -> None:
+    covariance_matrix_daily_flow(
+        output, dtype, max_bytes, database, optimizer_factors
+    )
+
+
+def covariance_matrix_backfill_pipeline(
+    start_date: dt.date,
+    end_date: dt.date,
+    database: Database,
+    output: CovarianceOutput = CovarianceOutput.DENSE,
+    dtype: np.dtype = np.float64,
+    max_bytes: int = 2 * 1024**3,
+    workers: int | None = None,
+    optimizer_factors: bool = False,
+) -> None:
+    covariance_matrix_backfill_flow(
+        start_date,
+        end_date,
+        database,
+        output,
+        dtype,
+        max_bytes,
+        workers,
+        optimizer_factors,
+    )
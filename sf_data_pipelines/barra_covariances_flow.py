@@ -1,97 +1,97 @@
 from datetime import date
-import zipfile
 import polars as pl
-from io import BytesIO
-from sf_data_pipelines.utils import barra_schema, barra_columns, get_last_market_date
-import os
+from sf_data_pipelines.utils import barra_columns, get_last_market_date
 from tqdm import tqdm
 from sf_data_pipelines.utils.barra_datasets import barra_covariances
-from sf_data_pipelines.utils.tables import Database
-
-
-def load_barra_history_files(year: int) -> pl.DataFrame:
-    file_name = barra_covariances.file_name()
-
-    dfs = []
-    for zip_folder_name in sorted(os.listdir(barra_covariances.history_zip_folder())):
-        if barra_covariances.history_zip_file(year) in zip_folder_name:
-            with zipfile.ZipFile(
-                f"{barra_covariances.history_zip_folder()}/{zip_folder_name}", "r"
-            ) as zip_folder:
-                folder_dfs = [
-                    pl.read_csv(
-                        BytesIO(zip_folder.read(file)),
-                        skip_rows=2,
-                        separator="|",
-                        schema_overrides=barra_schema,
-                        try_parse_dates=True,
-                    )
-                    for file in zip_folder.namelist()
-                    if file.startswith(file_name)
-                ]
-
-                folder_df = (
-                    pl.concat(folder_dfs, how="vertical")
-                    if folder_dfs
-                    else pl.DataFrame()
-                )
-                dfs.append(folder_df)
-
-    return pl.concat(dfs, how="vertical") if dfs else pl.DataFrame()
+from sf_data_pipelines.utils.tables import Database, Table
+from sf_data_pipelines.utils.ingestion import load_daily_files
+from sf_data_pipelines.utils.enums import CovarianceStorage, Executor
+from sf_data_pipelines.utils.covariances import pack, read_factor_covariances
+from sf_data_pipelines.utils.extraction import load_zip_members
+
+
+def load_barra_history_files(
+    year: int, workers: int | None = None, executor: Executor = Executor.THREAD
+) -> pl.DataFrame:
+    return load_zip_members(
+        barra_covariances.history_zip_folder_paths(year),
+        barra_covariances.file_name(),
+        barra_covariances.skip_rows,
+        workers=workers,
+        executor=executor,
+    )
 
 
 def load_current_barra_files() -> pl.DataFrame:
-    dfs = []
+    return load_daily_files(barra_covariances, get_last_market_date(n_days=60))
 
-    dates = get_last_market_date(n_days=60)
 
-    for date_ in dates:
-        zip_folder_path = barra_covariances.daily_zip_folder_path(date_)
-        file_name = barra_covariances.file_name(date_)
+def clean_barra_df(
+    df: pl.DataFrame, storage: CovarianceStorage = CovarianceStorage.FULL
+) -> pl.DataFrame:
+    df = (
+        df.rename(barra_columns, strict=False)
+        .with_columns(pl.col("date").str.strptime(pl.Date, "%Y%m%d"))
+        .filter(pl.col("factor_1").ne("[End of File]"))
+    )
 
-        if os.path.exists(zip_folder_path):
-            with zipfile.ZipFile(zip_folder_path, "r") as zip_folder:
-                dfs.append(
-                    pl.read_csv(
-                        BytesIO(zip_folder.read(file_name)),
-                        skip_rows=2,
-                        separator="|",
-                        schema_overrides=barra_schema,
-                        try_parse_dates=True,
-                    )
-                )
+    match storage:
+        case CovarianceStorage.FULL:
+            return (
+                df.sort(["factor_1", "factor_2"])
+                .pivot(index=["date", "factor_1"], on="factor_2", values="covariance")
+                .sort(["factor_1", "date"])
+            )
+        case CovarianceStorage.PACKED:
+            return pack(df)
 
-    df = pl.concat(dfs)
 
-    return df
+def covariances_table(database: Database, storage: CovarianceStorage) -> Table:
+    match storage:
+        case CovarianceStorage.FULL:
+            return database.covariances_table
+        case CovarianceStorage.PACKED:
+            return database.packed_covariances_table
 
 
-def clean_barra_df(df: pl.DataFrame) -> pl.DataFrame:
-    return (
-        df.rename(barra_columns, strict=False)
-        .with_columns(pl.col("date").str.strptime(pl.Date, "%Y%m%d"))
-        .filter(pl.col("factor_1").ne("[End of File]"))
-        .sort(["factor_1", "factor_2"])
-        .pivot(index=["date", "factor_1"], on="factor_2", values="covariance")
-        .sort(["factor_1", "date"])
-    )
+def refresh_covariance_tensor(database: Database, start: date, end: date) -> None:
+    """Copy the stored covariances of a date range into the tensor store."""
+    dates, tensor = read_factor_covariances(database, start, end)
+    database.covariance_tensor.write(dates, tensor)
 
 
 def barra_covariances_history_flow(
-    start_date: date, end_date: date, database: Database
+    start_date: date,
+    end_date: date,
+    database: Database,
+    workers: int | None = None,
+    executor: Executor = Executor.THREAD,
+    storage: CovarianceStorage = CovarianceStorage.FULL,
 ) -> None:
+    table = covariances_table(database, storage)
     years = list(range(start_date.year, end_date.year + 1))
 
     for year in tqdm(years, desc="Barra Covariances"):
-        raw_df = load_barra_history_files(year)
-        clean_df = clean_barra_df(raw_df)
-        database.covariances_table.create_if_not_exists(year)
-        database.covariances_table.upsert(year, clean_df)
+        raw_df = load_barra_history_files(year, workers, executor)
+        clean_df = clean_barra_df(raw_df, storage)
+        table.create_if_not_exists(year)
+        table.upsert(year, clean_df)
 
+        refresh_covariance_tensor(database, date(year, 1, 1), date(year, 12, 31))
 
-def barra_covariances_daily_flow(database: Database) -> None:
-    raw_df = load_current_barra_files()
-    clean_df = clean_barra_df(raw_df)
+
+def barra_covariances_daily_flow(
+    database: Database,
+    raw_df: pl.DataFrame | None = None,
+    storage: CovarianceStorage = CovarianceStorage.FULL,
+) -> None:
+    table = covariances_table(database, storage)
+    raw_df = load_current_barra_files() if raw_df is None else raw_df
+
+    if raw_df.is_empty():
+        return
+
+    clean_df = clean_barra_df(raw_df, storage)
 
     years = clean_df.select(pl.col("date").dt.year().unique().sort().alias("year"))[
         "year"
@@ -100,5 +100,7 @@ def barra_covariances_daily_flow(database: Database) -> None:
     for year in tqdm(years, desc="Daily Barra Covariances"):
         year_df = clean_df.filter(pl.col("date").dt.year().eq(year))
 
-        database.covariances_table.create_if_not_exists(year)
-        database.covariances_table.upsert(year, year_df)
+        table.create_if_not_exists(year)
+        table.upsert(year, year_df)
+
+    refresh_covariance_tensor(database, clean_df["date"].min(), clean_df["date"].max())
@@ -1,69 +1,28 @@
 from datetime import date
-import zipfile
 import polars as pl
-from io import BytesIO
-from sf_data_pipelines.utils import barra_schema, barra_columns, get_last_market_date
-import os
+from sf_data_pipelines.utils import barra_columns, get_last_market_date
 from tqdm import tqdm
 from sf_data_pipelines.utils.barra_datasets import barra_exposures
 from sf_data_pipelines.utils.tables import Database
-
-
-def load_barra_history_files(year: int) -> pl.DataFrame:
-    file_name = barra_exposures.file_name()
-
-    dfs = []
-    for zip_folder_name in sorted(os.listdir(barra_exposures.history_zip_folder())):
-        if barra_exposures.history_zip_file(year) in zip_folder_name:
-            with zipfile.ZipFile(
-                f"{barra_exposures.history_zip_folder()}/{zip_folder_name}", "r"
-            ) as zip_folder:
-                folder_dfs = [
-                    pl.read_csv(
-                        BytesIO(zip_folder.read(file)),
-                        skip_rows=2,
-                        separator="|",
-                        schema_overrides=barra_schema,
-                        try_parse_dates=True,
-                    )
-                    for file in zip_folder.namelist()
-                    if file.startswith(file_name)
-                ]
-
-                folder_df = (
-                    pl.concat(folder_dfs, how="vertical")
-                    if folder_dfs
-                    else pl.DataFrame()
-                )
-                dfs.append(folder_df)
-
-    return pl.concat(dfs, how="vertical") if dfs else pl.DataFrame()
+from sf_data_pipelines.utils.ingestion import load_daily_files
+from sf_data_pipelines.utils.enums import Executor
+from sf_data_pipelines.utils.extraction import load_zip_members
+
+
+def load_barra_history_files(
+    year: int, workers: int | None = None, executor: Executor = Executor.THREAD
+) -> pl.DataFrame:
+    return load_zip_members(
+        barra_exposures.history_zip_folder_paths(year),
+        barra_exposures.file_name(),
+        barra_exposures.skip_rows,
+        workers=workers,
+        executor=executor,
+    )
 
 
 def load_current_barra_files() -> pl.DataFrame:
-    dfs = []
-
-    dates = get_last_market_date(n_days=60)
-
-    for date_ in dates:
-        zip_folder_path = barra_exposures.daily_zip_folder_path(date_)
-        file_name = barra_exposures.file_name(date_)
-
-        if os.path.exists(zip_folder_path):
-            with zipfile.ZipFile(zip_folder_path, "r") as zip_folder:
-                dfs.append(
-                    pl.read_csv(
-                        BytesIO(zip_folder.read(file_name)),
-                        skip_rows=2,
-                        separator="|",
-                        schema_overrides=barra_schema,
-                        try_parse_dates=True,
-                    )
-                )
-
-    df = pl.concat(dfs)
-
-    return df
+    return load_daily_files(barra_exposures, get_last_market_date(n_days=60))
 
 
 def clean_barra_df(df: pl.DataFrame) -> pl.DataFrame:
@@ -77,21 +36,44 @@ def clean_barra_df(df: pl.DataFrame) -> pl.DataFrame:
     )
 
 
+def refresh_exposures_tensor(database: Database, start: date, end: date) -> None:
+    """Copy the stored exposures of a date range into the tensor store."""
+    database.exposures_tensor.write(
+        database.exposures_table.read(start=start, end=end).collect()
+    )
+
+
 def barra_exposures_history_flow(
-    start_date: date, end_date: date, database: Database
+    start_date: date,
+    end_date: date,
+    database: Database,
+    workers: int | None = None,
+    executor: Executor = Executor.THREAD,
+    tensor: bool = False,
 ) -> None:
+    # Once built, the tensor store is kept up to date
+    tensor = tensor or database.exposures_tensor.exists()
     years = list(range(start_date.year, end_date.year + 1))
 
     for year in tqdm(years, desc="Barra Exposures"):
-        raw_df = load_barra_history_files(year)
+        raw_df = load_barra_history_files(year, workers, executor)
         clean_df = clean_barra_df(raw_df)
 
         database.exposures_table.create_if_not_exists(year)
         database.exposures_table.upsert(year, clean_df)
 
+        if tensor:
+            refresh_exposures_tensor(database, date(year, 1, 1), date(year, 12, 31))
+
+
+def barra_exposures_daily_flow(
+    database: Database, raw_df: pl.DataFrame | None = None, tensor: bool = False
+) -> None:
+    raw_df = load_current_barra_files() if raw_df is None else raw_df
+
+    if raw_df.is_empty():
+        return
 
-def barra_exposures_daily_flow(database: Database) -> None:
-    raw_df = load_current_barra_files()
     clean_df = clean_barra_df(raw_df)
 
     years = clean_df.select(pl.col("date").dt.year().unique().sort().alias("year"))[
@@ -103,3 +85,8 @@ def barra_exposures_daily_flow(database: Database) -> None:
 
         database.exposures_table.create_if_not_exists(year)
         database.exposures_table.upsert(year, year_df)
+
+    if tensor or database.exposures_tensor.exists():
+        refresh_exposures_tensor(
+            database, clean_df["date"].min(), clean_df["date"].max()
+        )
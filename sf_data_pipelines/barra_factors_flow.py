@@ -1,32 +1,16 @@
-import zipfile
 import polars as pl
-from io import BytesIO
-from sf_data_pipelines.utils import barra_schema, barra_columns
-import os
+from sf_data_pipelines.utils import barra_columns
 from tqdm import tqdm
 from sf_data_pipelines.utils import get_last_market_date
 from sf_data_pipelines.utils.barra_datasets import barra_factors
 from sf_data_pipelines.utils.tables import Database
+from sf_data_pipelines.utils.ingestion import load_daily_files
 
 
 def load_current_barra_files() -> pl.DataFrame:
-    dates = get_last_market_date(n_days=60)
-
-    for date_ in reversed(dates):
-        zip_folder_path = barra_factors.daily_zip_folder_path(date_)
-        file_path = barra_factors.file_name(date_)
-
-        if os.path.exists(zip_folder_path):
-            with zipfile.ZipFile(zip_folder_path, "r") as zip_folder:
-                return pl.read_csv(
-                    BytesIO(zip_folder.read(file_path)),
-                    skip_rows=2,
-                    separator="|",
-                    schema_overrides=barra_schema,
-                    try_parse_dates=True,
-                )
-
-    return pl.DataFrame()
+    return load_daily_files(
+        barra_factors, get_last_market_date(n_days=60), latest_only=True
+    )
 
 
 def clean_barra_df(df: pl.DataFrame) -> pl.DataFrame:
@@ -42,8 +26,14 @@ def clean_barra_df(df: pl.DataFrame) -> pl.DataFrame:
     return df
 
 
-def barra_factors_daily_flow(database: Database) -> None:
-    raw_df = load_current_barra_files()
+def barra_factors_daily_flow(
+    database: Database, raw_df: pl.DataFrame | None = None
+) -> None:
+    raw_df = load_current_barra_files() if raw_df is None else raw_df
+
+    if raw_df.is_empty():
+        return
+
     clean_df = clean_barra_df(raw_df)
 
     years = clean_df.select(pl.col("date").dt.year().unique().sort().alias("year"))[
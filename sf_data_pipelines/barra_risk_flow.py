@@ -1,69 +1,28 @@
 from datetime import date
-import zipfile
 import polars as pl
-from io import BytesIO
-from sf_data_pipelines.utils import barra_schema, barra_columns, get_last_market_date
+from sf_data_pipelines.utils import barra_columns, get_last_market_date
 from sf_data_pipelines.utils.barra_datasets import barra_risk
-from sf_data_pipelines.utils.tables import Database
-import os
+from sf_data_pipelines.utils.tables import Database, Table, TableBuilder
+from sf_data_pipelines.utils.ingestion import load_daily_files
+from sf_data_pipelines.utils.enums import Executor
+from sf_data_pipelines.utils.extraction import load_zip_members
 from tqdm import tqdm
 
 
-def load_barra_history_files(year: int) -> pl.DataFrame:
-    file_name = barra_risk.file_name()
-
-    dfs = []
-    for zip_folder_name in sorted(os.listdir(barra_risk.history_zip_folder())):
-        if barra_risk.history_zip_file(year) in zip_folder_name:
-            with zipfile.ZipFile(
-                f"{barra_risk.history_zip_folder()}/{zip_folder_name}", "r"
-            ) as zip_folder:
-                folder_dfs = [
-                    pl.read_csv(
-                        BytesIO(zip_folder.read(file)),
-                        skip_rows=2,
-                        separator="|",
-                        schema_overrides=barra_schema,
-                        try_parse_dates=True,
-                    )
-                    for file in zip_folder.namelist()
-                    if file.startswith(file_name)
-                ]
-
-                folder_df = (
-                    pl.concat(folder_dfs, how="vertical")
-                    if folder_dfs
-                    else pl.DataFrame()
-                )
-                dfs.append(folder_df)
-
-    return pl.concat(dfs, how="vertical") if dfs else pl.DataFrame()
+def load_barra_history_files(
+    year: int, workers: int | None = None, executor: Executor = Executor.THREAD
+) -> pl.DataFrame:
+    return load_zip_members(
+        barra_risk.history_zip_folder_paths(year),
+        barra_risk.file_name(),
+        barra_risk.skip_rows,
+        workers=workers,
+        executor=executor,
+    )
 
 
 def load_current_barra_files() -> pl.DataFrame:
-    dfs = []
-
-    dates = get_last_market_date(n_days=60)
-
-    for date_ in dates:
-        zip_folder_path = barra_risk.daily_zip_folder_path(date_)
-        file_name = barra_risk.file_name(date_)
-
-        if os.path.exists(zip_folder_path):
-            with zipfile.ZipFile(zip_folder_path, "r") as zip_folder:
-                dfs.append(
-                    pl.read_csv(
-                        BytesIO(zip_folder.read(file_name)),
-                        skip_rows=2,
-                        separator="|",
-                        schema_overrides=barra_schema,
-                        try_parse_dates=True,
-                    )
-                )
-
-    df = pl.concat(dfs)
-
-    return df
+    return load_daily_files(barra_risk, get_last_market_date(n_days=60))
 
 
 def clean_barra_df(df: pl.DataFrame) -> pl.DataFrame:
@@ -76,20 +35,35 @@ def clean_barra_df(df: pl.DataFrame) -> pl.DataFrame:
 
 
 def barra_risk_history_flow(
-    start_date: date, end_date: date, database: Database
+    start_date: date,
+    end_date: date,
+    database: Database,
+    workers: int | None = None,
+    executor: Executor = Executor.THREAD,
+    assets_table: Table | TableBuilder | None = None,
 ) -> None:
+    assets_table = assets_table or database.assets_table
     years = list(range(start_date.year, end_date.year + 1))
 
     for year in tqdm(years, desc="Barra Risk"):
-        raw_df = load_barra_history_files(year)
+        raw_df = load_barra_history_files(year, workers, executor)
         clean_df = clean_barra_df(raw_df)
 
-        database.assets_table.create_if_not_exists(year)
-        database.assets_table.update(year, clean_df)
+        assets_table.create_if_not_exists(year)
+        assets_table.update(year, clean_df)
+
+
+def barra_risk_daily_flow(
+    database: Database,
+    raw_df: pl.DataFrame | None = None,
+    assets_table: Table | TableBuilder | None = None,
+) -> None:
+    assets_table = assets_table or database.assets_table
+    raw_df = load_current_barra_files() if raw_df is None else raw_df
 
+    if raw_df.is_empty():
+        return
 
-def barra_risk_daily_flow(database: Database) -> None:
-    raw_df = load_current_barra_files()
     clean_df = clean_barra_df(raw_df)
 
     years = clean_df.select(pl.col("date").dt.year().unique().sort().alias("year"))[
@@ -99,5 +73,5 @@ def barra_risk_daily_flow(database: Database) -> None:
     for year in tqdm(years, desc="Daily Barra Risk"):
         year_df = clean_df.filter(pl.col("date").dt.year().eq(year))
 
-        database.assets_table.create_if_not_exists(year)
-        database.assets_table.update(year, year_df)
+        assets_table.create_if_not_exists(year)
+        assets_table.update(year, year_df)
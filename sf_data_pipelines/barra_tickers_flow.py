@@ -1,32 +1,16 @@
-import zipfile
+from datetime import date
 import polars as pl
-from io import BytesIO
-from sf_data_pipelines.utils import barra_schema, barra_columns
-import os
-from tqdm import tqdm
+from sf_data_pipelines.utils import barra_columns
 from sf_data_pipelines.utils import get_last_market_date
 from sf_data_pipelines.utils.barra_datasets import barra_ids
-from sf_data_pipelines.utils.tables import Database
-import datetime as dt
+from sf_data_pipelines.utils.tables import Database, Table, TableBuilder
+from sf_data_pipelines.utils.ingestion import load_daily_files
+from sf_data_pipelines.utils.identity import materialize_intervals
 
 def load_current_barra_files() -> pl.DataFrame:
-    dates = get_last_market_date(n_days=60)
-
-    for date_ in reversed(dates):
-        zip_folder_path = barra_ids.daily_zip_folder_path(date_)
-        file_path = barra_ids.file_name(date_)
-
-        if os.path.exists(zip_folder_path):
-            with zipfile.ZipFile(zip_folder_path, "r") as zip_folder:
-                return pl.read_csv(
-                    BytesIO(zip_folder.read(file_path)),
-                    skip_rows=1,
-                    separator="|",
-                    schema_overrides=barra_schema,
-                    try_parse_dates=True,
-                )
-
-    return pl.DataFrame()
+    return load_daily_files(
+        barra_ids, get_last_market_date(n_days=60), latest_only=True
+    )
 
 
 def clean_barra_df(df: pl.DataFrame) -> pl.DataFrame:
@@ -45,23 +29,33 @@ def clean_barra_df(df: pl.DataFrame) -> pl.DataFrame:
     )
 
 
-def barra_tickers_daily_flow(database: Database) -> None:
-    raw_df = load_current_barra_files()
-    clean_df = clean_barra_df(raw_df)
-
-    min_date = clean_df['start_date'].min()
-    max_date = min(clean_df['end_date'].max(), dt.date.today())
-
-    years = list(range(min_date.year, max_date.year + 1))
-
-    for year in tqdm(years, desc="Barra Tickers"):
-        if database.assets_table.exists(year):
-            database.assets_table.update_asof(
-                year=year,
-                right_df=clean_df,
-                left_on='date',
-                right_on='start_date',
-                by='barrid',
-                strategy='backward',
-                drop_right_cols=['start_date', 'end_date']
-            )
+def barra_tickers_daily_flow(
+    database: Database,
+    raw_df: pl.DataFrame | None = None,
+    assets_table: Table | TableBuilder | None = None,
+    refresh_years: list[int] | None = None,
+    materialize: bool = True,
+    refresh_dates: list[date] | None = None,
+) -> None:
+    interval_table = database.tickers_table
+    raw_df = load_current_barra_files() if raw_df is None else raw_df
+
+    if not raw_df.is_empty():
+        clean_df = clean_barra_df(raw_df)
+    elif interval_table.exists():
+        # An unchanged file is not re-read, so reuse the stored intervals for refreshes
+        clean_df = interval_table.read().collect()
+    else:
+        return
+
+    # The interval table is the source of truth; materializing the
+    # attributes into the assets table is kept for readers of the year files
+    materialize_intervals(
+        assets_table or database.assets_table,
+        interval_table,
+        clean_df,
+        refresh_years,
+        materialize,
+        refresh_dates=refresh_dates,
+        desc="Barra Tickers",
+    )
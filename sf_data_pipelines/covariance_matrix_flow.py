@@ -1,13 +1,26 @@
 import datetime as dt
+import hashlib
 import sf_data_pipelines.utils.s3
 import polars as pl
 import os
+import shutil
 import zipfile
 import io
+import tempfile
 from dotenv import load_dotenv
+from tqdm import tqdm
 import numpy as np
 from sf_data_pipelines.utils import get_last_market_date
+from sf_data_pipelines.utils.enums import CovarianceOutput, Executor
+from sf_data_pipelines.utils.covariances import (
+    read_factor_covariance,
+    read_factor_covariances,
+    stack,
+)
+from sf_data_pipelines.utils.extraction import get_pool
+from sf_data_pipelines.utils.factor_model import FactorModel
 from sf_data_pipelines.utils.factors import factors
+from sf_data_pipelines.utils.tables import Database
 
 load_dotenv(override=True)
 
@@ -45,6 +58,8 @@ cusips_column_mapping = {
     "EndDate": "end_date",
 }
 
+optimizer_components = ["cholesky", "loadings", "specific_risk"]
+
 root_ids_column_mapping = {
     "!Barrid": "barrid",
     "Name": "name",
@@ -159,7 +174,7 @@ def get_etf_exposures(date_: dt.date, barrids: list[str]) -> pl.DataFrame:
         return clean_exposures(df, barrids)
 
 
-def get_factor_covariances(date_: dt.date):
+def get_factor_covariances(date_: dt.date) -> np.ndarray:
     date_str_1 = date_.strftime("%y%m%d")
     date_str_2 = date_.strftime("%Y%m%d")
 
@@ -173,7 +188,9 @@ def get_factor_covariances(date_: dt.date):
             separator="|",
         )
 
-        return clean_covariances(df)
+        _, covariances = stack(clean_covariances(df))
+
+        return covariances[0]
 
 
 def get_stock_specific_risk(date_: dt.date, barrids: list[str]) -> pl.DataFrame:
@@ -210,11 +227,20 @@ def get_etf_specific_risk(date_: dt.date, barrids: list[str]) -> pl.DataFrame:
         return clean_specific_risk(df, barrids)
 
 
-def construct_covariance_matrix(
-    exposures: pl.DataFrame, covariances: pl.DataFrame, specific_risk: pl.DataFrame
-) -> pl.DataFrame:
+def factor_model(
+    exposures: pl.DataFrame, covariances: np.ndarray, specific_risk: pl.DataFrame
+) -> FactorModel:
+    """
+    Factor model of the exposure rows, from a symmetric (K, K) factor
+    covariance matrix and specific risk in the vendor's percent units.
+    """
     barrids = exposures["barrid"].to_list()
 
+    # Line specific risk up with the exposure rows
+    specific_risk = exposures.select("barrid").join(
+        specific_risk, on="barrid", how="left"
+    )
+
     exposures = (
         exposures.drop("date", "barrid")
         .with_columns(
@@ -223,16 +249,6 @@ def construct_covariance_matrix(
         .to_numpy()
     )
 
-    covariances = (
-        covariances.drop("date", "factor_1")
-        .with_columns(pl.all().truediv(100**2))
-        .to_numpy()
-    )
-
-    mask = np.isnan(covariances)
-    covariances[mask] = covariances.T[mask]  # fill symetric values
-
-
     specific_risk = (
         specific_risk.drop("barrid")
         .with_columns(pl.all().truediv(100))
@@ -241,9 +257,24 @@ def construct_covariance_matrix(
     )
 
     # Square the specific risk to get specific variance
-    specific_variance = np.diag(specific_risk ** 2)
+    return FactorModel(
+        ids=barrids,
+        factors=factors,
+        exposures=exposures,
+        factor_covariance=covariances / 100**2,
+        specific_variance=specific_risk**2,
+    )
+
+
+def construct_covariance_matrix(
+    exposures: pl.DataFrame, covariances: np.ndarray, specific_risk: pl.DataFrame
+) -> pl.DataFrame:
+    model = factor_model(exposures, covariances, specific_risk)
+    barrids = model.ids
 
-    covariance_matrix = exposures @ covariances @ exposures.T + specific_variance
+    covariance_matrix = np.empty((len(barrids), len(barrids)))
+    for start, tile in model.tiles():
+        covariance_matrix[start : start + len(tile)] = tile
 
     covariance_matrix_df = (
         pl.from_numpy(covariance_matrix, barrids)
@@ -288,10 +319,80 @@ def get_barrids(date_: dt.date):
         return clean_root_ids(df, date_)
 
 
-def covariance_matrix_daily_flow() -> None:
-    date_ = get_last_market_date()[0]
+def upload_covariance_matrix(
+    date_: dt.date,
+    exposures: pl.DataFrame,
+    covariances: np.ndarray,
+    specific_risk: pl.DataFrame,
+    ticker_mapping: dict[str, str],
+    dtype: np.dtype = np.float64,
+    max_bytes: int = 2 * 1024**3,
+) -> None:
+    # 3. Construct the factor model, keyed by ticker in ticker order
+    model = factor_model(exposures, covariances, specific_risk).rekey(ticker_mapping)
+    model = model.subset(sorted(model.ids))
+
+    # 4. Stream the covariance matrix to disk tile by tile
+    with tempfile.TemporaryDirectory() as temp_dir:
+        file_path = f"{temp_dir}/latest.parquet"
+        model.write_parquet(file_path, date_, dtype=dtype, max_bytes=max_bytes)
+
+        # 5. Upload to s3
+        sf_data_pipelines.utils.s3.upload_file(
+            file_path=file_path,
+            bucket_name="barra-covariance-matrices",
+            file_name="latest.parquet",
+        )
+
+
+def upload_factor_model(
+    date_: dt.date,
+    exposures: pl.DataFrame,
+    covariances: np.ndarray,
+    specific_risk: pl.DataFrame,
+    ticker_mapping: dict[str, str],
+) -> None:
+    # 3. Construct the factor model, keyed by ticker
+    model = factor_model(exposures, covariances, specific_risk).rekey(ticker_mapping)
+
+    # 4. Upload X, F and D to s3
+    for component, df in zip(
+        ["exposures", "factor_covariance", "specific_variance"],
+        model.to_frames(date_),
+    ):
+        sf_data_pipelines.utils.s3.write_parquet(
+            bucket_name="barra-covariance-matrices",
+            file_name=f"latest/{component}.parquet",
+            file_data=df.sort(df.columns[1]),
+        )
+
+
+def upload_optimizer_factors(
+    date_: dt.date,
+    exposures: pl.DataFrame,
+    covariances: np.ndarray,
+    specific_risk: pl.DataFrame,
+    ticker_mapping: dict[str, str],
+) -> None:
+    model = factor_model(exposures, covariances, specific_risk).rekey(ticker_mapping)
+
+    for component, df in zip(optimizer_components, model.optimizer_frames(date_)):
+        sf_data_pipelines.utils.s3.write_parquet(
+            bucket_name="barra-covariance-matrices",
+            file_name=f"latest/optimizer/{component}.parquet",
+            file_data=df.sort(df.columns[1]),
+        )
+
+
+def get_ticker_mapping(
+    date_: dt.date, database: Database | None = None
+) -> dict[str, str]:
+    if database is not None:
+        ticker_mapping = get_ticker_mapping_from_database(database, date_)
+
+        if ticker_mapping is not None:
+            return ticker_mapping
 
-    # 1. Get barrids and tickers
     tickers_df = get_tickers(date_)
 
     barrids_df = (
@@ -304,43 +405,421 @@ def covariance_matrix_daily_flow() -> None:
 
     barrids = barrids_df["barrid"].to_list()
     tickers = barrids_df["ticker"].to_list()
-    ticker_mapping = {barrid: ticker for barrid, ticker in zip(barrids, tickers)}
 
-    # 2. Get exposures
-    stock_exposures = get_stock_exposures(date_, barrids)
+    return {barrid: ticker for barrid, ticker in zip(barrids, tickers)}
+
+
+def get_ticker_mapping_from_database(
+    database: Database, date_: dt.date
+) -> dict[str, str] | None:
+    tickers_table = database.tickers_table
+    asset_identity_table = database.asset_identity_table
+
+    if not tickers_table.exists() or not asset_identity_table.exists():
+        return None
+
+    barrids_df = (
+        asset_identity_table.read()
+        .filter(
+            pl.col("instrument").is_in(["STOCK", "ETF", "ADR"]),
+            pl.col("start_date").le(date_),
+            pl.col("end_date").ge(date_),
+            pl.col("iso_country_code").eq("USA"),
+        )
+        .select("barrid")
+        .unique("barrid")
+        .join(
+            tickers_table.read()
+            .filter(pl.col("start_date").le(date_), pl.col("end_date").ge(date_))
+            .sort("barrid", "start_date")
+            .unique("barrid", keep="last", maintain_order=True)
+            .select("barrid", "ticker"),
+            on="barrid",
+            how="inner",
+        )
+        .sort("barrid")
+        .collect()
+    )
+
+    if barrids_df.is_empty():
+        return None
+
+    return dict(zip(barrids_df["barrid"], barrids_df["ticker"]))
+
+
+def get_stock_inputs_from_database(
+    database: Database, date_: dt.date, barrids: list[str]
+) -> tuple[pl.DataFrame, np.ndarray, pl.DataFrame] | None:
+    """
+    Stock exposures, factor covariances and stock specific risk on `date_`
+    from the database, or None if any of them is not loaded for that date.
+    """
+    exposures = (
+        database.exposures_table.read(
+            start=date_,
+            end=date_,
+            columns=["date", "barrid", *factors],
+            barrids=barrids,
+        )
+        .sort("barrid")
+        .collect()
+    )
+
+    covariances = read_factor_covariance(database, date_)
+
+    specific_risk = (
+        database.assets_table.read(
+            start=date_,
+            end=date_,
+            columns=["barrid", "specific_risk"],
+            barrids=barrids,
+        )
+        .filter(pl.col("specific_risk").is_not_null())
+        .sort("barrid")
+        .collect()
+    )
+
+    if exposures.is_empty() or covariances is None or specific_risk.is_empty():
+        return None
+
+    return exposures, covariances, specific_risk
+
+
+def get_factor_model_inputs(
+    date_: dt.date, barrids: list[str], database: Database | None = None
+) -> tuple[pl.DataFrame, np.ndarray, pl.DataFrame]:
+    """
+    Exposures, factor covariances and specific risk of `barrids` on `date_`.
+
+    With a database, the stock inputs come from a single-date scan of the
+    exposures, covariances and assets tables and only the ETF files are
+    read from the zips. Dates the database has not loaded fall back to
+    the zips.
+    """
+    stock_inputs = (
+        get_stock_inputs_from_database(database, date_, barrids)
+        if database is not None
+        else None
+    )
+
+    if stock_inputs is None:
+        stock_inputs = (
+            get_stock_exposures(date_, barrids),
+            get_factor_covariances(date_),
+            get_stock_specific_risk(date_, barrids),
+        )
+
+    stock_exposures, covariances, stock_specific_risk = stock_inputs
+
+    # Exposures
     etf_exposures = get_etf_exposures(date_, barrids)
 
     exposures: pl.DataFrame = pl.concat([stock_exposures, etf_exposures])
 
-    # 3. Get covariances
-    covariances = get_factor_covariances(date_)
-
-    # 4. Get specific risk
-    stock_specific_risk = get_stock_specific_risk(date_, barrids)
+    # Specific risk
     etf_specific_risk = get_etf_specific_risk(date_, barrids)
     specific_risk: pl.DataFrame = pl.concat([stock_specific_risk, etf_specific_risk])
 
-    # 5. Construct covariance matrix
-    covariance_matrix = construct_covariance_matrix(
-        exposures, covariances, specific_risk
+    return exposures, covariances, specific_risk
+
+
+def subset_covariance_matrix(
+    date_: dt.date | None = None,
+    tickers: list[str] | None = None,
+    barrids: list[str] | None = None,
+    database: Database | None = None,
+) -> pl.DataFrame:
+    """
+    Covariance matrix of the requested assets only.
+
+    Only the exposure and specific risk rows of the requested assets are
+    kept, so the cost grows with the number of requested assets rather than
+    the universe.
+
+    Args:
+        date_: Model date, defaults to the last market date
+        tickers: Tickers to include, keys the result by ticker
+        barrids: Barrids to include, keys the result by barrid
+        database: Read the inputs from this database where it has them
+
+    Returns:
+        DataFrame of (date, ticker or barrid, *ids) rows sorted by id
+    """
+    if (tickers is None) == (barrids is None):
+        raise ValueError("Pass exactly one of tickers or barrids.")
+
+    date_ = date_ or get_last_market_date()[0]
+
+    if tickers is not None:
+        barrid_mapping = {
+            ticker: barrid
+            for barrid, ticker in get_ticker_mapping(date_, database).items()
+        }
+
+        missing = sorted(set(tickers) - set(barrid_mapping))
+        if missing:
+            raise ValueError(f"No barrid on {date_} for tickers: {missing}")
+
+        key, ids = "ticker", sorted(set(tickers))
+        barrids = [barrid_mapping[ticker] for ticker in ids]
+    else:
+        key, ids = "barrid", sorted(set(barrids))
+        barrids = ids
+
+    model = factor_model(*get_factor_model_inputs(date_, barrids, database)).rekey(
+        dict(zip(barrids, ids))
     )
 
-    # 6. Re-key covariance matrix
-    covariance_matrix_re_keyed = (
-        covariance_matrix.rename(ticker_mapping, strict=False)
-        .with_columns(pl.col("barrid").replace(ticker_mapping))
-        .rename({"barrid": "ticker"})
+    missing = sorted(set(ids) - set(model.ids))
+    if missing:
+        raise ValueError(f"No exposures on {date_} for: {missing}")
+
+    return (
+        pl.from_numpy(model.block(ids), ids)
+        .with_columns(pl.lit(date_).alias("date"), pl.Series(key, ids))
+        .select("date", key, *ids)
     )
 
-    tickers = covariance_matrix_re_keyed["ticker"].unique().sort().to_list()
 
-    covariance_matrix_clean = covariance_matrix_re_keyed.select(
-        pl.lit(date_).alias("date"), "ticker", *sorted(tickers)
-    ).sort("ticker")
+def covariance_matrix_daily_flow(
+    output: CovarianceOutput = CovarianceOutput.DENSE,
+    dtype: np.dtype = np.float64,
+    max_bytes: int = 2 * 1024**3,
+    database: Database | None = None,
+    optimizer_factors: bool = False,
+) -> None:
+    """
+    Publish the latest Barra asset covariance matrix to S3.
+
+    The dense output is the N x N matrix keyed by ticker, built in row tiles
+    of at most `max_bytes` and streamed to parquet. The factor output
+    publishes exposures, factor covariance and specific variance instead,
+    which `FactorModel.read_s3` turns back into a model for risk
+    calculations. With a database, inputs it has already loaded are read
+    from its tables instead of the vendor zips. With `optimizer_factors`,
+    the square roots of the matrix from `FactorModel.optimizer_frames` are
+    published alongside it.
+    """
+    date_ = get_last_market_date()[0]
+
+    # 1. Get barrids and tickers
+    ticker_mapping = get_ticker_mapping(date_, database)
+    barrids = list(ticker_mapping)
 
-    # 7. Upload to s3
-    sf_data_pipelines.utils.s3.write_parquet(
-        bucket_name="barra-covariance-matrices",
-        file_name="latest.parquet",
-        file_data=covariance_matrix_clean,
+    # 2. Get exposures, covariances and specific risk
+    exposures, covariances, specific_risk = get_factor_model_inputs(
+        date_, barrids, database
     )
+
+    match output:
+        case CovarianceOutput.DENSE:
+            upload_covariance_matrix(
+                date_,
+                exposures,
+                covariances,
+                specific_risk,
+                ticker_mapping,
+                dtype,
+                max_bytes,
+            )
+        case CovarianceOutput.FACTOR:
+            upload_factor_model(
+                date_, exposures, covariances, specific_risk, ticker_mapping
+            )
+
+    if optimizer_factors:
+        upload_optimizer_factors(
+            date_, exposures, covariances, specific_risk, ticker_mapping
+        )
+
+
+def covariance_matrix_path(database: Database, date_: dt.date) -> str:
+    return (
+        f"{database.base_path}/covariance_matrices"
+        f"/year={date_.year}/date={date_.isoformat()}"
+    )
+
+
+def inputs_hash(
+    output: CovarianceOutput,
+    dtype: np.dtype,
+    optimizer_factors: bool,
+    exposures: pl.DataFrame,
+    covariances: np.ndarray,
+    specific_risk: pl.DataFrame,
+) -> str:
+    """
+    Fingerprint of one date's inputs and output options, independent of row order.
+
+    Each frame is sorted and hashed as Arrow IPC bytes, which unlike
+    `hash_rows` do not change between Polars versions, and the covariance
+    matrix as its little-endian float64 bytes.
+    """
+    hasher = hashlib.sha256(
+        "\0".join([output.value, np.dtype(dtype).name, str(optimizer_factors)]).encode()
+    )
+
+    for df in [exposures, specific_risk]:
+        hasher.update(b"\0")
+        hasher.update(df.sort(df.columns).rechunk().write_ipc(None).getvalue())
+
+    hasher.update(b"\0")
+    hasher.update(np.ascontiguousarray(covariances, dtype="<f8").tobytes())
+
+    return hasher.hexdigest()
+
+
+def build_covariance_matrix(
+    date_: dt.date,
+    path: str,
+    output: CovarianceOutput,
+    dtype: np.dtype,
+    max_bytes: int,
+    optimizer_factors: bool,
+    exposures: pl.DataFrame,
+    covariances: np.ndarray,
+    specific_risk: pl.DataFrame,
+    hash_: str,
+) -> None:
+    """Write one date's covariance matrix, or its components, keyed by barrid."""
+    # Clear the previous build, which may be of the other output
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path)
+
+    model = factor_model(exposures, covariances, specific_risk)
+    model = model.subset(sorted(model.ids))
+
+    match output:
+        case CovarianceOutput.DENSE:
+            model.write_parquet(
+                f"{path}/covariance_matrix.parquet",
+                date_,
+                key="barrid",
+                dtype=dtype,
+                max_bytes=max_bytes,
+            )
+        case CovarianceOutput.FACTOR:
+            for component, df in zip(
+                ["exposures", "factor_covariance", "specific_variance"],
+                model.to_frames(date_, key="barrid"),
+            ):
+                df.write_parquet(f"{path}/{component}.parquet")
+
+    if optimizer_factors:
+        for component, df in zip(
+            optimizer_components, model.optimizer_frames(date_, key="barrid")
+        ):
+            df.write_parquet(f"{path}/optimizer_{component}.parquet")
+
+    # Written last, so a date is only skipped once its outputs are complete
+    with open(f"{path}/_inputs.tmp", "w") as file:
+        file.write(hash_)
+    os.replace(f"{path}/_inputs.tmp", f"{path}/_inputs")
+
+
+def built_hash(path: str) -> str | None:
+    if not os.path.exists(f"{path}/_inputs"):
+        return None
+
+    with open(f"{path}/_inputs") as file:
+        return file.read().strip()
+
+
+def covariance_matrix_backfill_flow(
+    start_date: dt.date,
+    end_date: dt.date,
+    database: Database,
+    output: CovarianceOutput = CovarianceOutput.DENSE,
+    dtype: np.dtype = np.float64,
+    max_bytes: int = 2 * 1024**3,
+    workers: int | None = None,
+    optimizer_factors: bool = False,
+) -> None:
+    """
+    Build the covariance matrix of every date in a range from the database.
+
+    Each year of exposures, covariances and specific risk is read once and
+    the dates are built on a process pool into
+    `covariance_matrices/year=YYYY/date=YYYY-MM-DD/`, keyed by barrid. A
+    date whose inputs and options hash to the same value as its last build
+    is skipped. ETFs are not loaded into the database, so they are not
+    included.
+
+    Args:
+        start_date: First date to build
+        end_date: Last date to build
+        database: Database to read inputs from and write outputs to
+        output: Dense matrix or factor model components
+        dtype: Float type of the dense matrix
+        max_bytes: Memory budget of each worker's dense build
+        workers: Process pool size (defaults to the number of CPUs)
+        optimizer_factors: Also write the optimizer square roots of each
+            date's matrix
+    """
+    years = list(range(start_date.year, end_date.year + 1))
+
+    with get_pool(Executor.PROCESS, workers) as pool:
+        for year in tqdm(years, desc="Covariance Matrices"):
+            start = max(start_date, dt.date(year, 1, 1))
+            end = min(end_date, dt.date(year, 12, 31))
+
+            exposures = (
+                database.exposures_table.read(
+                    start=start, end=end, columns=["date", "barrid", *factors]
+                )
+                .sort("date", "barrid")
+                .collect()
+                .partition_by("date", as_dict=True)
+            )
+            dates, covariances = read_factor_covariances(database, start, end)
+            specific_risk = (
+                database.assets_table.read(
+                    start=start,
+                    end=end,
+                    columns=["date", "barrid", "specific_risk"],
+                )
+                .filter(pl.col("specific_risk").is_not_null())
+                .sort("date", "barrid")
+                .collect()
+                .partition_by("date", as_dict=True, include_key=False)
+            )
+
+            futures = []
+            for date_, date_covariances in zip(dates, covariances):
+                date_exposures = exposures.get((date_,))
+                date_specific_risk = specific_risk.get((date_,))
+
+                if date_exposures is None or date_specific_risk is None:
+                    continue
+
+                path = covariance_matrix_path(database, date_)
+                hash_ = inputs_hash(
+                    output,
+                    dtype,
+                    optimizer_factors,
+                    date_exposures,
+                    date_covariances,
+                    date_specific_risk,
+                )
+
+                if built_hash(path) == hash_:
+                    continue
+
+                futures.append(
+                    pool.submit(
+                        build_covariance_matrix,
+                        date_,
+                        path,
+                        output,
+                        dtype,
+                        max_bytes,
+                        optimizer_factors,
+                        date_exposures,
+                        date_covariances,
+                        date_specific_risk,
+                        hash_,
+                    )
+                )
+
+            for future in futures:
+                future.result()
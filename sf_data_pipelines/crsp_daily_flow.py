@@ -1,19 +1,23 @@
-from datetime import date
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import date, timedelta
 from sf_data_pipelines.utils import crsp_schema
 import polars as pl
-import wrds
 from tqdm import tqdm
 from sf_data_pipelines.utils.tables import Database
+from sf_data_pipelines.utils.wrds_reader import WrdsReader, shared_wrds_reader
 
 
-def load_crsp_daily_df(start_date: date, end_date: date) -> pl.DataFrame:
-    wrds_db = wrds.Connection(wrds_username="amh1124")
+def load_crsp_daily_df(
+    start_date: date, end_date: date, reader: WrdsReader | None = None
+) -> pl.DataFrame:
+    reader = reader or shared_wrds_reader()
 
-    df = wrds_db.raw_sql(
+    df = reader.read(
         f"""
             SELECT
                 date,
-                permno,
+                CAST(permno AS INTEGER) AS permno,
                 cusip,
                 ret,
                 retx,
@@ -23,25 +27,87 @@ def load_crsp_daily_df(start_date: date, end_date: date) -> pl.DataFrame:
                 askhi,
                 bidlo,
                 shrout
-            FROM crsp_m_stock.dsf a
+            FROM {reader.table("crsp_m_stock", "dsf")} a
             WHERE a.date BETWEEN '{start_date}' AND '{end_date}'
-            ;
-            """
+            """,
+        schema=crsp_schema,
+        partition_on="permno",
     )
-    df = pl.from_pandas(df, schema_overrides=crsp_schema)
 
     return df
 
 
 def crsp_daily_backfill_flow(
-    start_date: date, end_date: date, database: Database
+    start_date: date,
+    end_date: date,
+    database: Database,
+    reader: WrdsReader | None = None,
+    workers: int = 2,
 ) -> None:
+    """
+    Load CRSP daily one year per query, with queries and writes overlapping.
+
+    Up to `workers` years are in flight at once, counting from when a year's
+    query is sent until its rows are written. A single writer upserts each
+    year as soon as its query returns, so WRDS is never idle while parquet
+    is written. Each query is also split over the reader's partitions, so
+    up to `workers` times `reader.partitions` connections are open at once.
+    """
     years = list(range(start_date.year, end_date.year + 1))
+    reader = reader or shared_wrds_reader()
+
+    slots = threading.Semaphore(workers)
+    progress = tqdm(total=len(years), desc="CRSP Daily")
+    writes = []
+
+    def write_year(year: int, query: Future) -> None:
+        try:
+            df = query.result()
+
+            database.crsp_daily_table.create_if_not_exists(year)
+            database.crsp_daily_table.upsert(year, df)
+            progress.update()
+        finally:
+            slots.release()
+
+    # The query pool shuts down first, so every write is queued before the
+    # writer is shut down
+    with (
+        ThreadPoolExecutor(max_workers=1) as writer,
+        ThreadPoolExecutor(max_workers=workers) as queries,
+    ):
+        for year in years:
+            slots.acquire()
+
+            query = queries.submit(
+                load_crsp_daily_df,
+                start_date=max(start_date, date(year, 1, 1)),
+                end_date=min(end_date, date(year, 12, 31)),
+                reader=reader,
+            )
+            query.add_done_callback(
+                lambda query, year=year: writes.append(
+                    writer.submit(write_year, year, query)
+                )
+            )
+
+    progress.close()
+
+    # Raise the first failed query or write
+    for write in writes:
+        write.result()
+
+
+def crsp_daily_update_flow(
+    database: Database, reader: WrdsReader | None = None
+) -> None:
+    """Load the rows dated after the last date in the crsp_daily table."""
+    last_date = database.crsp_daily_table.max_date()
+
+    if last_date is None:
+        raise ValueError("The crsp_daily table is empty, run a backfill first.")
 
-    for year in tqdm(years, desc="CRSP Daily"):
-        df = load_crsp_daily_df(
-            start_date=date(year, 1, 1), end_date=date(year, 12, 31)
-        )
+    start_date, end_date = last_date + timedelta(days=1), date.today()
 
-        database.crsp_daily_table.create_if_not_exists(year)
-        database.crsp_daily_table.upsert(year, df)
+    if start_date <= end_date:
+        crsp_daily_backfill_flow(start_date, end_date, database, reader)
@@ -1,42 +1,62 @@
-from datetime import date
+from datetime import date, timedelta
 from sf_data_pipelines.utils import crsp_schema
 import polars as pl
-import wrds
 from tqdm import tqdm
 from sf_data_pipelines.utils.tables import Database
+from sf_data_pipelines.utils.wrds_reader import WrdsReader, shared_wrds_reader
 
 
-def load_crsp_events_df(start_date: date, end_date: date) -> pl.DataFrame:
-    wrds_db = wrds.Connection(wrds_username="amh1124")
+def load_crsp_events_df(
+    start_date: date, end_date: date, reader: WrdsReader | None = None
+) -> pl.DataFrame:
+    reader = reader or shared_wrds_reader()
 
-    df = wrds_db.raw_sql(
+    df = reader.read(
         f"""
             SELECT
                 date,
-                permno,
+                CAST(permno AS INTEGER) AS permno,
                 ticker,
                 shrcd,
                 exchcd
-            FROM crsp_m_stock.dse a
+            FROM {reader.table("crsp_m_stock", "dse")} a
             WHERE a.date BETWEEN '{start_date}' AND '{end_date}'
                 AND event = 'NAMES'
-            ;
-            """
+            """,
+        schema=crsp_schema,
+        partition_on="permno",
     )
-    df = pl.from_pandas(df, schema_overrides=crsp_schema)
 
     return df
 
 
 def crsp_events_backfill_flow(
-    start_date: date, end_date: date, database: Database
+    start_date: date,
+    end_date: date,
+    database: Database,
+    reader: WrdsReader | None = None,
 ) -> None:
     years = list(range(start_date.year, end_date.year + 1))
 
-    df = load_crsp_events_df(start_date, end_date)
+    df = load_crsp_events_df(start_date, end_date, reader)
 
     for year in tqdm(years, desc="CRSP Events"):
         year_df = df.filter(pl.col("date").dt.year().eq(year))
 
         database.crsp_events_table.create_if_not_exists(year)
         database.crsp_events_table.upsert(year, year_df)
+
+
+def crsp_events_update_flow(
+    database: Database, reader: WrdsReader | None = None
+) -> None:
+    """Load the rows dated after the last date in the crsp_events table."""
+    last_date = database.crsp_events_table.max_date()
+
+    if last_date is None:
+        raise ValueError("The crsp_events table is empty, run a backfill first.")
+
+    start_date, end_date = last_date + timedelta(days=1), date.today()
+
+    if start_date <= end_date:
+        crsp_events_backfill_flow(start_date, end_date, database, reader)
@@ -1,44 +1,64 @@
-from datetime import date
+from datetime import date, timedelta
 from sf_data_pipelines.utils import crsp_schema
 import polars as pl
-import wrds
 from tqdm import tqdm
 from sf_data_pipelines.utils.tables import Database
+from sf_data_pipelines.utils.wrds_reader import WrdsReader, shared_wrds_reader
 
 
-def load_crsp_monthly_df(start_date: date, end_date: date) -> pl.DataFrame:
-    wrds_db = wrds.Connection(wrds_username="amh1124")
+def load_crsp_monthly_df(
+    start_date: date, end_date: date, reader: WrdsReader | None = None
+) -> pl.DataFrame:
+    reader = reader or shared_wrds_reader()
 
-    df = wrds_db.raw_sql(
+    df = reader.read(
         f"""
         SELECT
             date,
-            permno,
+            CAST(permno AS INTEGER) AS permno,
             cusip,
             ret,
             retx,
             prc,
             vol,
             shrout
-        FROM crsp_m_stock.msf a
+        FROM {reader.table("crsp_m_stock", "msf")} a
         WHERE a.date BETWEEN '{start_date}' AND '{end_date}'
-        ;
-        """
+        """,
+        schema=crsp_schema,
+        partition_on="permno",
     )
-    df = pl.from_pandas(df, schema_overrides=crsp_schema)
 
     return df
 
 
 def crsp_monthly_backfill_flow(
-    start_date: date, end_date: date, database: Database
+    start_date: date,
+    end_date: date,
+    database: Database,
+    reader: WrdsReader | None = None,
 ) -> None:
     years = list(range(start_date.year, end_date.year + 1))
 
-    df = load_crsp_monthly_df(start_date, end_date)
+    df = load_crsp_monthly_df(start_date, end_date, reader)
 
     for year in tqdm(years, desc="CRSP Monthly"):
         year_df = df.filter(pl.col("date").dt.year().eq(year))
 
         database.crsp_monthly_table.create_if_not_exists(year)
         database.crsp_monthly_table.upsert(year, year_df)
+
+
+def crsp_monthly_update_flow(
+    database: Database, reader: WrdsReader | None = None
+) -> None:
+    """Load the rows dated after the last date in the crsp_monthly table."""
+    last_date = database.crsp_monthly_table.max_date()
+
+    if last_date is None:
+        raise ValueError("The crsp_monthly table is empty, run a backfill first.")
+
+    start_date, end_date = last_date + timedelta(days=1), date.today()
+
+    if start_date <= end_date:
+        crsp_monthly_backfill_flow(start_date, end_date, database, reader)
@@ -1,28 +1,48 @@
-from datetime import date
+from datetime import date, timedelta
 from sf_data_pipelines.utils import russell_schema, russell_columns
 import polars as pl
-import wrds
 from tqdm import tqdm
 from sf_data_pipelines.utils.tables import Database
+from sf_data_pipelines.utils.wrds_reader import WrdsReader, shared_wrds_reader
 
 
-def load_ftse_russell_df(start_date: date, end_date: date) -> pl.DataFrame:
+def load_ftse_russell_df(
+    start_date: date, end_date: date, reader: WrdsReader | None = None
+) -> pl.DataFrame:
     """Load FTSE Russell data from WRDS for the given date range."""
-    wrds_db = wrds.Connection(wrds_username="amh1124")
+    reader = reader or shared_wrds_reader()
 
-    df = wrds_db.raw_sql(
+    # CUSIPs are strings, so the query is split on date ranges instead
+    return reader.read_date_ranges(
         f"""
             SELECT 
                 date, 
                 cusip, 
                 russell2000,
                 russell1000
-            FROM ftse_russell_us.idx_holdings_us
-            WHERE date BETWEEN '{start_date}' AND '{end_date}'
-            ORDER BY cusip, date
-        """
-    )
-    return pl.from_pandas(df, schema_overrides=russell_schema)
+            FROM {reader.table("ftse_russell_us", "idx_holdings_us")}
+            WHERE date BETWEEN '{{start_date}}' AND '{{end_date}}'
+        """,
+        start_date,
+        end_date,
+        schema=russell_schema,
+    ).sort("cusip", "date")
+
+
+def load_last_ftse_russell_date(
+    on_or_before: date, reader: WrdsReader | None = None
+) -> date | None:
+    """Last date with FTSE Russell holdings on or before `on_or_before`."""
+    reader = reader or shared_wrds_reader()
+
+    return reader.read(
+        f"""
+            SELECT MAX(date) AS date
+            FROM {reader.table("ftse_russell_us", "idx_holdings_us")}
+            WHERE date <= '{on_or_before}'
+        """,
+        schema=russell_schema,
+    )["date"][0]
 
 
 def clean(df: pl.DataFrame) -> pl.DataFrame:
@@ -32,35 +52,76 @@ def clean(df: pl.DataFrame) -> pl.DataFrame:
     )
 
 
-def get_universe(database: Database) -> pl.LazyFrame:
+def get_universe(database: Database, start_date: date, end_date: date) -> pl.LazyFrame:
     """Get the base universe of assets."""
     return (
-        database.assets_table.read()
+        database.assets_table.read(
+            start=start_date,
+            end=end_date,
+            columns=['date', 'barrid', 'rootid', 'cusip', 'iso_country_code'],
+        )
         .filter(pl.col("barrid").eq(pl.col("rootid")))
         .filter(pl.col("iso_country_code").eq("USA"))
         .select('date', 'barrid', 'cusip')
     )
 
 
-def get_russell_rebalance_dates(universe: pl.LazyFrame, df_ftse: pl.DataFrame) -> pl.LazyFrame:
-    """Identify Russell rebalance dates."""
+def get_russell_rebalance_dates(joined: pl.LazyFrame) -> pl.LazyFrame:
+    """Identify Russell rebalance dates in the universe joined with FTSE data."""
     return (
-        universe
-        .join(df_ftse.lazy(), on=['date', 'cusip'], how='left')
+        joined
         .filter(pl.col("russell_1000") | pl.col("russell_2000"))
         .select("date", pl.lit(True).alias("russell_rebalance"))
         .unique()
     )
 
 
-def get_in_universe_fields(database: Database, df_ftse: pl.DataFrame) -> pl.DataFrame:
-    """Compute in_universe fields by joining FTSE data with the universe."""
-    universe = get_universe(database)
-    russell_rebalance_dates = get_russell_rebalance_dates(universe, df_ftse)
+def get_russell_state(database: Database, before: date) -> pl.DataFrame:
+    """
+    Russell membership of each barrid on its last asset row before `before`.
 
+    Only the stored rows from the start of the previous year are read, which
+    covers every asset through at least one annual reconstitution.
+    """
     return (
-        universe
-        .join(df_ftse.lazy(), on=['date', 'cusip'], how='left')
+        database.assets_table.read(
+            start=date(before.year - 1, 1, 1),
+            end=before - timedelta(days=1),
+            columns=['date', 'barrid', 'russell_1000', 'russell_2000'],
+        )
+        .sort("barrid", "date")
+        .group_by("barrid")
+        .agg(pl.col('russell_1000', 'russell_2000').drop_nulls().last())
+        .collect()
+    )
+
+
+def carry_russell_state(state: pl.DataFrame, fields: pl.DataFrame) -> pl.DataFrame:
+    """Membership of each barrid at the end of `fields`, or as of `state`."""
+    last = (
+        fields.group_by("barrid")
+        .agg(pl.col('russell_1000', 'russell_2000').last())
+    )
+
+    # Null memberships in `last` keep the earlier state
+    return state.update(last, on="barrid", how="full")
+
+
+def get_in_universe_fields(
+    universe: pl.LazyFrame, df_ftse: pl.DataFrame, state: pl.DataFrame
+) -> pl.DataFrame:
+    """
+    Compute in_universe fields by joining FTSE data with the universe.
+
+    Membership is set on rebalance dates and carried forward per barrid.
+    Rows before a barrid's first rebalance date take its membership from
+    `state`, so consecutive spans chain like one long span.
+    """
+    joined = universe.join(df_ftse.lazy(), on=['date', 'cusip'], how='left')
+    russell_rebalance_dates = get_russell_rebalance_dates(joined)
+
+    return (
+        joined
         .join(russell_rebalance_dates, on="date", how="left")
         .with_columns(
             pl.when(pl.col("russell_rebalance")).then(
@@ -73,6 +134,11 @@ def get_in_universe_fields(database: Database, df_ftse: pl.DataFrame) -> pl.Data
             .fill_null(strategy="forward")
             .over("barrid")
         )
+        .join(state.lazy(), on="barrid", how="left", suffix="_state")
+        .with_columns(
+            pl.col('russell_1000').fill_null(pl.col('russell_1000_state')),
+            pl.col('russell_2000').fill_null(pl.col('russell_2000_state')),
+        )
         .with_columns(
             pl.col('russell_1000').or_(pl.col('russell_2000')).alias('in_universe')
         )
@@ -83,29 +149,60 @@ def get_in_universe_fields(database: Database, df_ftse: pl.DataFrame) -> pl.Data
 
 
 def ftse_russell_backfill_flow(
-    start_date: date, end_date: date, database: Database
+    start_date: date,
+    end_date: date,
+    database: Database,
+    reader: WrdsReader | None = None,
 ) -> None:
     """
     Flow for orchestrating FTSE Russell backfill.
-    
-    Loads all FTSE data at once, computes in_universe fields,
-    then updates files by year.
+
+    Works one year at a time: loads the year's FTSE data, computes the
+    in_universe fields of the year's assets and updates the year's file.
+    Each barrid's membership at the end of a year carries into the next,
+    starting from what is stored before `start_date`, so at most one year
+    of assets is in memory.
     """
-    # Load all FTSE data for the entire date range
-    raw_df = load_ftse_russell_df(start_date=start_date, end_date=end_date)
-    clean_df = clean(raw_df)
-    
-    # Compute in_universe fields once for all data
-    in_universe_fields = get_in_universe_fields(database, clean_df)
-    
-    # Update files by year
+    state = get_russell_state(database, start_date)
     years = list(range(start_date.year, end_date.year + 1))
-    
+
     for year in tqdm(years, desc="Updating FTSE Russell by year"):
-        # Filter in_universe_fields for the current year
-        year_data = in_universe_fields.filter(
-            (pl.col("date").dt.year() == year)
+        if not database.assets_table.exists(year):
+            continue
+
+        year_start = max(start_date, date(year, 1, 1))
+        year_end = min(end_date, date(year, 12, 31))
+
+        raw_df = load_ftse_russell_df(
+            start_date=year_start, end_date=year_end, reader=reader
         )
-        
-        if database.assets_table.exists(year):
-            database.assets_table.update(year, year_data, on=["date", "barrid"])
\ No newline at end of file
+        year_data = get_in_universe_fields(
+            get_universe(database, year_start, year_end), clean(raw_df), state
+        )
+
+        database.assets_table.update(year, year_data, on=["date", "barrid"])
+        state = carry_russell_state(state, year_data)
+
+
+def ftse_russell_update_flow(
+    database: Database, reader: WrdsReader | None = None
+) -> None:
+    """
+    Fill the Russell fields of the asset rows dated after the last filled one.
+
+    The load restarts at the last holdings date on or before the watermark,
+    so holdings that were published after the last run are still applied.
+    Membership before that date is carried from the stored rows.
+    """
+    last_date = database.assets_table.max_date("russell_1000")
+
+    if last_date is None:
+        raise ValueError("The Russell fields are empty, run a backfill first.")
+
+    start_date = load_last_ftse_russell_date(last_date, reader) or (
+        last_date + timedelta(days=1)
+    )
+    end_date = date.today()
+
+    if start_date <= end_date:
+        ftse_russell_backfill_flow(start_date, end_date, database, reader)
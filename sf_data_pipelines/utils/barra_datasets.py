@@ -12,6 +12,7 @@ class BarraDataset:
         history_zip_file: str | None,
         daily_zip_file: str,
         file_name: str,
+        skip_rows: int,
     ) -> None:
         load_dotenv(override=True)
 
@@ -23,6 +24,7 @@ class BarraDataset:
         self._history_zip_file = history_zip_file
         self._daily_zip_file = daily_zip_file
         self._file_name = file_name
+        self.skip_rows = skip_rows
 
     def history_zip_folder(self) -> Path:
         return self._base_path / self._history_folder
@@ -37,6 +39,13 @@ class BarraDataset:
             / f"{self._history_zip_file}_{year}.zip"
         )
 
+    def history_zip_folder_paths(self, year: int) -> list[Path]:
+        return [
+            self.history_zip_folder() / zip_folder_name
+            for zip_folder_name in sorted(os.listdir(self.history_zip_folder()))
+            if self.history_zip_file(year) in zip_folder_name
+        ]
+
     def file_name(self, date_: date | None = None) -> str:
         if date_:
             return f"{self._file_name}.{date_.strftime('%Y%m%d')}"
@@ -57,6 +66,7 @@ barra_returns = BarraDataset(
     daily_folder="us/usslow",
     daily_zip_file="SMD_USSLOWL_100",
     file_name="USSLOW_Daily_Asset_Price",
+    skip_rows=1,
 )
 
 barra_specific_returns = BarraDataset(
@@ -65,6 +75,7 @@ barra_specific_returns = BarraDataset(
     daily_folder="us/usslow",
     daily_zip_file="SMD_USSLOWL_100",
     file_name="USSLOW_100_Asset_DlySpecRet",
+    skip_rows=2,
 )
 
 barra_risk = BarraDataset(
@@ -73,6 +84,7 @@ barra_risk = BarraDataset(
     daily_folder="us/usslow",
     daily_zip_file="SMD_USSLOWL_100",
     file_name="USSLOWL_100_Asset_Data",
+    skip_rows=2,
 )
 
 barra_volume = BarraDataset(
@@ -81,6 +93,7 @@ barra_volume = BarraDataset(
     daily_folder="bime",
     daily_zip_file="SMD_USSLOW_Market_Data",
     file_name="USSLOW_Market_Data",
+    skip_rows=1,
 )
 
 barra_assets = BarraDataset(
@@ -89,6 +102,7 @@ barra_assets = BarraDataset(
     daily_folder="bime",
     daily_zip_file="SMD_USSLOW_XSEDOL_ID",
     file_name="USA_Asset_Identity",
+    skip_rows=1,
 )
 
 barra_ids = BarraDataset(
@@ -97,6 +111,7 @@ barra_ids = BarraDataset(
     daily_folder="bime",
     daily_zip_file="SMD_USSLOW_XSEDOL_ID",
     file_name="USA_XSEDOL_Asset_ID",
+    skip_rows=1,
 )
 
 barra_covariances = BarraDataset(
@@ -105,6 +120,7 @@ barra_covariances = BarraDataset(
     daily_folder="us/usslow",
     daily_zip_file="SMD_USSLOWL_100",
     file_name="USSLOWL_100_Covariance",
+    skip_rows=2,
 )
 
 barra_exposures = BarraDataset(
@@ -113,6 +129,7 @@ barra_exposures = BarraDataset(
     daily_folder="us/usslow",
     daily_zip_file="SMD_USSLOWL_100",
     file_name="USSLOWL_100_Asset_Exposure",
+    skip_rows=2,
 )
 
 
@@ -122,4 +139,5 @@ barra_factors = BarraDataset(
     daily_folder="bime",
     daily_zip_file="SMD_USSLOWL_100",
     file_name="USSLOWL_100_DlyFacRet",
+    skip_rows=2,
 )
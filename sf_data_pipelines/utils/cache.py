@@ -0,0 +1,111 @@
+import hashlib
+import os
+import polars as pl
+from dotenv import load_dotenv
+from pathlib import Path
+from sf_data_pipelines.utils import barra_schema
+
+
+class MemberCache:
+    """
+    Local parquet cache of parsed Barra zip members.
+
+    Entries are keyed by the zip folder path, member name, zip size and
+    mtime, and the parse options. A vendor file that is replaced or touched
+    gets a new key, so stale entries are never read; they age out through
+    `prune`, which evicts least recently used entries first.
+
+    The cache is opt-in: it is only used when a cache directory is passed
+    or set in BARRA_CACHE_DIR.
+    """
+
+    def __init__(self, cache_dir: Path | None = None, max_bytes: int | None = None):
+        load_dotenv(override=True)
+
+        cache_dir = cache_dir or os.getenv("BARRA_CACHE_DIR")
+
+        self._enabled = bool(cache_dir)
+        self._cache_dir = Path(cache_dir) if cache_dir else None
+        self._max_bytes = max_bytes or int(
+            float(os.getenv("BARRA_CACHE_MAX_GB", "100")) * 1024**3
+        )
+
+        if self._enabled:
+            os.makedirs(self._cache_dir, exist_ok=True)
+
+    @property
+    def enabled(self) -> bool:
+        return self._enabled
+
+    def key(
+        self, zip_folder_path: Path, file: str, skip_rows: int, kwargs: dict
+    ) -> str:
+        stat = os.stat(zip_folder_path)
+        parts = [
+            str(Path(zip_folder_path).resolve()),
+            file,
+            str(stat.st_size),
+            str(stat.st_mtime_ns),
+            str(skip_rows),
+            repr(sorted(kwargs.items())),
+            repr(sorted((name, str(dtype)) for name, dtype in barra_schema.items())),
+        ]
+        return hashlib.sha256("\0".join(parts).encode()).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self._cache_dir / key[:2] / f"{key}.parquet"
+
+    def get(self, key: str) -> pl.DataFrame | None:
+        if not self._enabled:
+            return None
+
+        path = self._path(key)
+        if not path.exists():
+            return None
+
+        # Bump the access time so eviction keeps recently used entries
+        os.utime(path)
+
+        return pl.read_parquet(path)
+
+    def put(self, key: str, df: pl.DataFrame) -> None:
+        if not self._enabled:
+            return
+
+        path = self._path(key)
+        os.makedirs(path.parent, exist_ok=True)
+
+        # Write then rename so concurrent workers never see a partial file
+        temp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        df.write_parquet(temp_path)
+        os.replace(temp_path, path)
+
+    def _entries(self) -> list[tuple[Path, os.stat_result]]:
+        if not self._enabled:
+            return []
+
+        return [(path, path.stat()) for path in self._cache_dir.glob("*/*.parquet")]
+
+    def size(self) -> int:
+        return sum(stat.st_size for _, stat in self._entries())
+
+    def prune(self, max_bytes: int | None = None) -> int:
+        """Evict least recently used entries until the cache fits in `max_bytes`."""
+        if not self._enabled:
+            return 0
+
+        max_bytes = self._max_bytes if max_bytes is None else max_bytes
+
+        entries = sorted(self._entries(), key=lambda entry: entry[1].st_mtime)
+        total_bytes = sum(stat.st_size for _, stat in entries)
+
+        removed = 0
+        for path, stat in entries:
+            if total_bytes <= max_bytes:
+                break
+
+            path.unlink(missing_ok=True)
+            total_bytes -= stat.st_size
+            removed += 1
+
+        return removed
@@ -0,0 +1,150 @@
+import contextlib
+import datetime as dt
+import fcntl
+import hashlib
+import os
+import polars as pl
+import tempfile
+from collections.abc import Iterator
+
+catalog_schema = {
+    "table": pl.String,
+    "file": pl.String,
+    "rows": pl.Int64,
+    "min_date": pl.Date,
+    "max_date": pl.Date,
+    "barrids": pl.Int64,
+    "schema_hash": pl.String,
+    "bytes": pl.Int64,
+    "mtime_ns": pl.Int64,
+    "updated_at": pl.Datetime,
+}
+
+
+def schema_hash(schema: pl.Schema | dict[str, pl.DataType]) -> str:
+    parts = [f"{name}:{dtype}" for name, dtype in schema.items()]
+    return hashlib.sha256("\0".join(parts).encode()).hexdigest()[:16]
+
+
+class Catalog:
+    """
+    Statistics of every file written to the tables of a database.
+
+    One row per (table, file) records the row count, date range, distinct
+    barrids, schema hash and size of the file, so coverage questions and
+    file pruning never have to open any data. Entries also keep the file's
+    mtime, and an entry whose file has since changed on disk is ignored.
+
+    Updates hold an exclusive lock on the catalog, so concurrent runs
+    writing to the same database never drop each other's entries.
+    """
+
+    def __init__(self, base_path: str) -> None:
+        self._base_path = base_path
+        self._file_path = f"{base_path}/_manifests/catalog.parquet"
+        self._lock_path = f"{self._file_path}.lock"
+
+        os.makedirs(os.path.dirname(self._file_path), exist_ok=True)
+
+    def read(self) -> pl.DataFrame:
+        if not os.path.exists(self._file_path):
+            return pl.DataFrame(schema=catalog_schema)
+
+        return pl.read_parquet(self._file_path)
+
+    @contextlib.contextmanager
+    def _locked(self) -> Iterator[None]:
+        """Hold the catalog lock for a read-modify-write."""
+        with open(self._lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _write(self, df: pl.DataFrame) -> None:
+        # Write then rename so a crash never leaves a truncated catalog
+        with tempfile.NamedTemporaryFile(
+            dir=os.path.dirname(self._file_path), suffix=".tmp", delete=False
+        ) as temp_file:
+            temp_path = temp_file.name
+
+        try:
+            df.sort("table", "file").write_parquet(temp_path)
+            os.replace(temp_path, self._file_path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+    def _path(self, table: str, file: str) -> str:
+        return f"{self._base_path}/{table}/{file}"
+
+    def entries(self, table: str) -> dict[str, dict]:
+        """Map each file of `table` to its statistics, if they are up to date."""
+        entries = {}
+        for row in self.read().filter(pl.col("table").eq(table)).iter_rows(named=True):
+            path = self._path(table, row["file"])
+
+            if not os.path.exists(path):
+                continue
+
+            stat = os.stat(path)
+            if (stat.st_size, stat.st_mtime_ns) == (row["bytes"], row["mtime_ns"]):
+                entries[path] = row
+
+        return entries
+
+    def record(self, table: str, file: str, df: pl.DataFrame) -> None:
+        """Record the statistics of `df`, which was just written to `file`."""
+        stat = os.stat(self._path(table, file))
+
+        has_date = "date" in df.columns
+        has_barrid = "barrid" in df.columns
+
+        row = pl.DataFrame(
+            [
+                {
+                    "table": table,
+                    "file": file,
+                    "rows": df.height,
+                    "min_date": df["date"].min() if has_date else None,
+                    "max_date": df["date"].max() if has_date else None,
+                    "barrids": df["barrid"].n_unique() if has_barrid else None,
+                    "schema_hash": schema_hash(df.schema),
+                    "bytes": stat.st_size,
+                    "mtime_ns": stat.st_mtime_ns,
+                    "updated_at": dt.datetime.now(),
+                }
+            ],
+            schema=catalog_schema,
+        )
+
+        with self._locked():
+            self._write(self.read().update(row, on=["table", "file"], how="full"))
+
+    def remove(self, table: str, files: list[str]) -> None:
+        if not files:
+            return
+
+        with self._locked():
+            self._write(
+                self.read().filter(
+                    ~(pl.col("table").eq(table) & pl.col("file").is_in(files))
+                )
+            )
+
+    def summary(self) -> pl.DataFrame:
+        """Coverage of each table: files, rows, date range and size."""
+        return (
+            self.read()
+            .group_by("table")
+            .agg(
+                pl.len().alias("files"),
+                pl.col("rows").sum(),
+                pl.col("min_date").min(),
+                pl.col("max_date").max(),
+                pl.col("schema_hash").n_unique().alias("schemas"),
+                pl.col("bytes").sum(),
+            )
+            .sort("table")
+        )
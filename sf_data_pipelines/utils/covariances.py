@@ -0,0 +1,141 @@
+import numpy as np
+import polars as pl
+from datetime import date
+from sf_data_pipelines.utils.factors import factors, packed_factor_pairs
+from sf_data_pipelines.utils.tables import Database
+
+
+def pack(df: pl.DataFrame) -> pl.DataFrame:
+    """
+    Pack long (date, factor_1, factor_2, covariance) rows into one upper
+    triangle array per date.
+
+    Each pair is stored once whichever triangle the vendor file lists it
+    in. Dates missing any pair are dropped.
+    """
+    positions = pl.DataFrame(
+        {
+            "factor_1": [factor_1 for factor_1, _ in packed_factor_pairs],
+            "factor_2": [factor_2 for _, factor_2 in packed_factor_pairs],
+            "position": range(len(packed_factor_pairs)),
+        }
+    )
+
+    rank = {factor: i for i, factor in enumerate(factors)}
+
+    return (
+        df.filter(pl.col("factor_1").is_in(factors), pl.col("factor_2").is_in(factors))
+        .with_columns(
+            pl.when(
+                pl.col("factor_1").replace_strict(rank)
+                <= pl.col("factor_2").replace_strict(rank)
+            )
+            .then(pl.struct(pl.col("factor_1"), pl.col("factor_2")))
+            .otherwise(
+                pl.struct(
+                    pl.col("factor_2").alias("factor_1"),
+                    pl.col("factor_1").alias("factor_2"),
+                )
+            )
+            .alias("pair")
+        )
+        .select("date", pl.col("pair").struct.unnest(), "covariance")
+        .join(positions, on=["factor_1", "factor_2"], how="inner")
+        .unique(["date", "position"], keep="last")
+        .sort("date", "position")
+        .group_by("date", maintain_order=True)
+        .agg(pl.col("covariance").cast(pl.Float64))
+        .filter(pl.col("covariance").list.len().eq(len(packed_factor_pairs)))
+        .with_columns(pl.col("covariance").list.to_array(len(packed_factor_pairs)))
+    )
+
+
+def unpack(packed: np.ndarray) -> np.ndarray:
+    """Symmetric (..., K, K) matrices from (..., K(K+1)/2) upper triangles."""
+    rows, columns = np.triu_indices(len(factors))
+
+    matrices = np.empty(packed.shape[:-1] + (len(factors), len(factors)))
+    matrices[..., rows, columns] = packed
+    matrices[..., columns, rows] = packed
+
+    return matrices
+
+
+def stack(covariances: pl.DataFrame) -> tuple[list[date], np.ndarray]:
+    """
+    Stack (date, factor_1, *factors) pivots of the covariances table into a
+    (T, K, K) array, keeping only dates with a full matrix.
+    """
+    covariances = (
+        covariances.filter(pl.len().over("date").eq(len(factors)))
+        .with_columns(pl.col("factor_1").cast(pl.Enum(factors)))
+        .sort("date", "factor_1")
+    )
+
+    dates = covariances["date"].unique(maintain_order=True).to_list()
+
+    tensor = (
+        covariances.select(factors)
+        .to_numpy()
+        .reshape(len(dates), len(factors), len(factors))
+    )
+
+    # Files only carry one triangle, so fill the other from the transpose
+    return dates, np.where(np.isnan(tensor), tensor.transpose(0, 2, 1), tensor)
+
+
+def read_factor_covariances(
+    database: Database, start: date, end: date
+) -> tuple[list[date], np.ndarray]:
+    """
+    Symmetric factor covariance matrices of every date in a range.
+
+    Dates in the packed table are unpacked directly; other dates are read
+    from the full covariances table and symmetrized. Values are in the
+    vendor's units (percent squared).
+
+    Args:
+        database: Database to read from
+        start: First date to read
+        end: Last date to read
+
+    Returns:
+        Sorted dates and a (T, K, K) array of their matrices
+    """
+    packed = (
+        database.packed_covariances_table.read(start=start, end=end)
+        .sort("date")
+        .collect()
+    )
+    packed_dates = packed["date"].to_list()
+
+    full_dates, full = stack(
+        database.covariances_table.read(
+            start=start, end=end, columns=["date", "factor_1", *factors]
+        )
+        .filter(~pl.col("date").is_in(packed_dates))
+        .collect()
+    )
+
+    dates = packed_dates + full_dates
+    tensor = np.concatenate(
+        [
+            unpack(
+                packed["covariance"]
+                .to_numpy()
+                .reshape(len(packed_dates), len(packed_factor_pairs))
+            ),
+            full,
+        ]
+    )
+
+    order = np.argsort(np.array(dates, dtype="datetime64[D]"), kind="stable")
+
+    return [dates[i] for i in order], tensor[order]
+
+
+def read_factor_covariance(database: Database, date_: date) -> np.ndarray | None:
+    """Symmetric (K, K) factor covariance matrix of `date_`, None if not loaded."""
+    dates, tensor = read_factor_covariances(database, date_, date_)
+
+    return tensor[0] if dates else None
@@ -5,3 +5,24 @@ class DatabaseName(Enum):
     RESEARCH = "research"
     PRODUCTION = "production"
     DEVELOPMENT = "development"
+
+
+class Executor(Enum):
+    THREAD = "thread"
+    PROCESS = "process"
+
+
+class Partitioning(Enum):
+    YEAR = "year"
+    MONTH = "month"
+    DATE = "date"
+
+
+class CovarianceStorage(Enum):
+    FULL = "full"
+    PACKED = "packed"
+
+
+class CovarianceOutput(Enum):
+    DENSE = "dense"
+    FACTOR = "factor"
@@ -0,0 +1,130 @@
+import multiprocessing
+import zipfile
+import polars as pl
+from concurrent.futures import Executor as PoolExecutor
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from io import BytesIO
+from itertools import repeat
+from pathlib import Path
+from sf_data_pipelines.utils import barra_schema
+from sf_data_pipelines.utils.cache import MemberCache
+from sf_data_pipelines.utils.enums import Executor
+
+
+def read_barra_file(data: bytes, skip_rows: int, **kwargs) -> pl.DataFrame:
+    return pl.read_csv(
+        BytesIO(data),
+        skip_rows=skip_rows,
+        separator="|",
+        schema_overrides=barra_schema,
+        try_parse_dates=True,
+        **kwargs,
+    )
+
+
+def read_zip_member(
+    zip_folder_path: Path,
+    file: str,
+    skip_rows: int,
+    kwargs: dict,
+    cache: MemberCache | None = None,
+) -> pl.DataFrame:
+    return read_zip_members(zip_folder_path, [(file, skip_rows)], kwargs, cache)[0]
+
+
+def get_pool(executor: Executor, workers: int | None) -> PoolExecutor:
+    match executor:
+        case Executor.THREAD:
+            return ThreadPoolExecutor(max_workers=workers)
+        case Executor.PROCESS:
+            # Polars is multithreaded, so forking a worker can deadlock.
+            return ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+            )
+
+
+def load_zip_members(
+    zip_folder_paths: list[Path],
+    file_name: str,
+    skip_rows: int,
+    workers: int | None = None,
+    executor: Executor = Executor.THREAD,
+    **kwargs,
+) -> pl.DataFrame:
+    """
+    Read every member starting with `file_name` from the given zip folders.
+
+    Members are parsed concurrently on a thread or process pool and
+    concatenated in archive order, so the result matches reading the
+    members one at a time.
+
+    Args:
+        zip_folder_paths: Zip folders to read, in order
+        file_name: Prefix of the members to read
+        skip_rows: Header rows to skip in each member
+        workers: Pool size (defaults to the executor's default)
+        executor: Run members on threads or processes
+        **kwargs: Extra arguments passed to `pl.read_csv`
+
+    Returns:
+        Concatenated DataFrame, empty if no member matched
+    """
+    members = []
+    for zip_folder_path in zip_folder_paths:
+        with zipfile.ZipFile(zip_folder_path, "r") as zip_folder:
+            members.extend(
+                (zip_folder_path, file)
+                for file in zip_folder.namelist()
+                if file.startswith(file_name)
+            )
+
+    if not members:
+        return pl.DataFrame()
+
+    paths, files = zip(*members)
+    cache = MemberCache()
+
+    with get_pool(executor, workers) as pool:
+        dfs = list(
+            pool.map(
+                read_zip_member,
+                paths,
+                files,
+                repeat(skip_rows),
+                repeat(kwargs),
+                repeat(cache),
+            )
+        )
+
+    return pl.concat(dfs, how="vertical")
+
+
+def read_zip_members(
+    zip_folder_path: Path,
+    files: list[tuple[str, int]],
+    kwargs: dict | None = None,
+    cache: MemberCache | None = None,
+) -> list[pl.DataFrame]:
+    """Read members of one zip folder, serving parsed members from the cache."""
+    kwargs = kwargs or {}
+    cache = cache or MemberCache()
+
+    dfs = {}
+    missing = []
+    for file, skip_rows in files:
+        key = cache.key(zip_folder_path, file, skip_rows, kwargs)
+        df = cache.get(key)
+
+        if df is None:
+            missing.append((file, skip_rows, key))
+        else:
+            dfs[file] = df
+
+    # Only open the zip folder when something has to be parsed
+    if missing:
+        with zipfile.ZipFile(zip_folder_path, "r") as zip_folder:
+            for file, skip_rows, key in missing:
+                dfs[file] = read_barra_file(zip_folder.read(file), skip_rows, **kwargs)
+                cache.put(key, dfs[file])
+
+    return [dfs[file] for file, _ in files]
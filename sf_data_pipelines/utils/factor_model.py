@@ -0,0 +1,316 @@
+import datetime as dt
+import numpy as np
+import polars as pl
+import pyarrow as pa
+import pyarrow.parquet as pq
+import sf_data_pipelines.utils.s3
+from pathlib import Path
+from typing import Iterator
+
+
+class FactorModel:
+    """
+    Asset covariance in factor form, Σ = X F X' + diag(D).
+
+    Holds exposures X (N x K), factor covariance F (K x K) and specific
+    variance D (N) and computes risk from them directly, so the N x N
+    matrix is never built. Weights are vectors aligned with `ids`.
+    """
+
+    def __init__(
+        self,
+        ids: list[str],
+        factors: list[str],
+        exposures: np.ndarray,
+        factor_covariance: np.ndarray,
+        specific_variance: np.ndarray,
+    ) -> None:
+        self.ids = ids
+        self.factors = factors
+        self.exposures = exposures
+        self.factor_covariance = factor_covariance
+        self.specific_variance = specific_variance
+
+        self._positions = {id_: i for i, id_ in enumerate(ids)}
+
+    @classmethod
+    def from_frames(
+        cls,
+        exposures: pl.DataFrame,
+        factor_covariance: pl.DataFrame,
+        specific_variance: pl.DataFrame,
+        key: str = "ticker",
+    ) -> "FactorModel":
+        """Build the model from the frames published by the covariance flow."""
+        factors = [col for col in exposures.columns if col not in ["date", key]]
+
+        exposures = exposures.sort(key)
+        specific_variance = exposures.select(key).join(
+            specific_variance, on=key, how="left"
+        )
+        factor_covariance = (
+            factor_covariance.with_columns(pl.col("factor_1").cast(pl.Enum(factors)))
+            .sort("factor_1")
+            .select(factors)
+        )
+
+        return cls(
+            ids=exposures[key].to_list(),
+            factors=factors,
+            exposures=exposures.select(factors).to_numpy(),
+            factor_covariance=factor_covariance.to_numpy(),
+            specific_variance=specific_variance["specific_variance"].to_numpy(),
+        )
+
+    def to_frames(
+        self, date_: dt.date, key: str = "ticker"
+    ) -> tuple[pl.DataFrame, pl.DataFrame, pl.DataFrame]:
+        """Exposures, factor covariance and specific variance frames for `date_`."""
+        date_column = pl.lit(date_).alias("date")
+
+        exposures = pl.from_numpy(self.exposures, self.factors).select(
+            date_column, pl.Series(key, self.ids), *self.factors
+        )
+        factor_covariance = pl.from_numpy(self.factor_covariance, self.factors).select(
+            date_column, pl.Series("factor_1", self.factors), *self.factors
+        )
+        specific_variance = pl.DataFrame(
+            {key: self.ids, "specific_variance": self.specific_variance}
+        ).select(date_column, key, "specific_variance")
+
+        return exposures, factor_covariance, specific_variance
+
+    def factor_covariance_root(self) -> np.ndarray:
+        """
+        L with L L' = F, the Cholesky factor when F is positive definite.
+
+        A factor covariance that is only semidefinite after rounding falls
+        back to V sqrt(max(λ, 0)) from its eigendecomposition.
+        """
+        try:
+            return np.linalg.cholesky(self.factor_covariance)
+        except np.linalg.LinAlgError:
+            eigenvalues, eigenvectors = np.linalg.eigh(self.factor_covariance)
+            return eigenvectors * np.sqrt(np.clip(eigenvalues, 0, None))
+
+    def optimizer_frames(
+        self, date_: dt.date, key: str = "ticker"
+    ) -> tuple[pl.DataFrame, pl.DataFrame, pl.DataFrame]:
+        """
+        Square roots of Σ for low-rank optimizer formulations.
+
+        With G = L'X' and s = sqrt(D), w'Σw = ||G w||² + ||s ∘ w||², which
+        an optimizer can use as a second-order cone constraint without
+        factoring Σ itself.
+
+        Returns:
+            L as (date, factor_1, *components), G' = X L as
+            (date, key, *components) and s as (date, key, specific_risk)
+        """
+        root = self.factor_covariance_root()
+        components = [f"component_{i:02d}" for i in range(len(self.factors))]
+        date_column = pl.lit(date_).alias("date")
+
+        cholesky = pl.from_numpy(root, components).select(
+            date_column, pl.Series("factor_1", self.factors), *components
+        )
+        loadings = pl.from_numpy(self.exposures @ root, components).select(
+            date_column, pl.Series(key, self.ids), *components
+        )
+        specific_risk = pl.DataFrame(
+            {key: self.ids, "specific_risk": np.sqrt(self.specific_variance)}
+        ).select(date_column, key, "specific_risk")
+
+        return cholesky, loadings, specific_risk
+
+    @classmethod
+    def read_s3(cls, bucket_name: str, prefix: str = "latest") -> "FactorModel":
+        """Read a model published by the covariance matrix flow."""
+        return cls.from_frames(
+            *(
+                sf_data_pipelines.utils.s3.get_parquet(
+                    bucket_name, f"{prefix}/{component}.parquet"
+                )
+                for component in [
+                    "exposures",
+                    "factor_covariance",
+                    "specific_variance",
+                ]
+            )
+        )
+
+    def subset(self, ids: list[str]) -> "FactorModel":
+        """Model of `ids` only, in the given order."""
+        indices = self.indices(ids)
+
+        return FactorModel(
+            ids=list(ids),
+            factors=self.factors,
+            exposures=self.exposures[indices],
+            factor_covariance=self.factor_covariance,
+            specific_variance=self.specific_variance[indices],
+        )
+
+    def rekey(self, mapping: dict[str, str]) -> "FactorModel":
+        """Same model with its ids renamed through `mapping`."""
+        return FactorModel(
+            ids=[mapping[id_] for id_ in self.ids],
+            factors=self.factors,
+            exposures=self.exposures,
+            factor_covariance=self.factor_covariance,
+            specific_variance=self.specific_variance,
+        )
+
+    def indices(self, ids: list[str]) -> np.ndarray:
+        """Positions of `ids` in the model, raising for unknown ids."""
+        missing = [id_ for id_ in ids if id_ not in self._positions]
+
+        if missing:
+            raise KeyError(f"Not in the factor model: {missing}")
+
+        return np.array([self._positions[id_] for id_ in ids], dtype=np.int64)
+
+    def weights(self, weights: dict[str, float]) -> np.ndarray:
+        """Dense weight vector from a mapping of id to weight."""
+        w = np.zeros(len(self.ids))
+        w[self.indices(list(weights))] = list(weights.values())
+        return w
+
+    def factor_exposures(self, w: np.ndarray) -> np.ndarray:
+        """Portfolio factor exposures X'w, or X'W for a (N, P) weight matrix."""
+        return self.exposures.T @ w
+
+    def _specific_variance(self, w: np.ndarray) -> np.ndarray:
+        return (
+            self.specific_variance if w.ndim == 1 else self.specific_variance[:, None]
+        )
+
+    def dot(self, w: np.ndarray) -> np.ndarray:
+        """Σw, or ΣW for a (N, P) weight matrix."""
+        b = self.factor_exposures(w)
+        return self.exposures @ (self.factor_covariance @ b) + (
+            self._specific_variance(w) * w
+        )
+
+    def variance(self, w: np.ndarray) -> float | np.ndarray:
+        """w'Σw, or the variance of each column of a (N, P) weight matrix."""
+        b = self.factor_exposures(w)
+        factor_variance = np.sum(b * (self.factor_covariance @ b), axis=0)
+        specific_variance = np.sum(self._specific_variance(w) * w**2, axis=0)
+        return factor_variance + specific_variance
+
+    def volatility(self, w: np.ndarray) -> float | np.ndarray:
+        return np.sqrt(self.variance(w))
+
+    def block(self, rows: list[str], columns: list[str] | None = None) -> np.ndarray:
+        """Dense sub-block Σ[rows, columns], the square block when `columns` is None."""
+        columns = rows if columns is None else columns
+
+        row_indices = self.indices(rows)
+        column_indices = self.indices(columns)
+
+        block = (
+            self.exposures[row_indices]
+            @ self.factor_covariance
+            @ self.exposures[column_indices].T
+        )
+
+        # Specific variance only sits on the diagonal of Σ
+        same = row_indices[:, None] == column_indices[None, :]
+        block[same] += np.broadcast_to(
+            self.specific_variance[row_indices][:, None], same.shape
+        )[same]
+
+        return block
+
+    def tile_rows(
+        self, dtype: np.dtype = np.float64, max_bytes: int = 2 * 1024**3
+    ) -> int:
+        """Rows per tile that keep a tile and its parquet copy within `max_bytes`."""
+        row_bytes = 2 * len(self.ids) * np.dtype(dtype).itemsize
+        return max(1, min(len(self.ids), max_bytes // row_bytes))
+
+    def tiles(
+        self, dtype: np.dtype = np.float64, max_bytes: int = 2 * 1024**3
+    ) -> Iterator[tuple[int, np.ndarray]]:
+        """
+        Yield Σ in row tiles as (first row, tile) pairs.
+
+        Each tile is X[rows] (F X') in `dtype` with the specific variance
+        added on its diagonal entries, so no N x N intermediate is ever
+        allocated.
+
+        Args:
+            dtype: Float type of the tiles, float32 halves their size
+            max_bytes: Memory budget for a tile and a copy of it
+
+        Yields:
+            Index of the first row of the tile and the tile itself
+        """
+        exposures = self.exposures.astype(dtype, copy=False)
+        factor_exposures = (self.factor_covariance @ self.exposures.T).astype(dtype)
+
+        step = self.tile_rows(dtype, max_bytes)
+
+        for start in range(0, len(self.ids), step):
+            stop = min(start + step, len(self.ids))
+
+            tile = exposures[start:stop] @ factor_exposures
+            rows = np.arange(stop - start)
+            tile[rows, start + rows] += self.specific_variance[start:stop].astype(dtype)
+
+            yield start, tile
+
+    def to_memmap(
+        self,
+        path: str | Path,
+        dtype: np.dtype = np.float64,
+        max_bytes: int = 2 * 1024**3,
+    ) -> np.memmap:
+        """Write Σ tile by tile into a memory-mapped (N, N) array at `path`."""
+        n = len(self.ids)
+        covariance_matrix = np.lib.format.open_memmap(
+            path, mode="w+", dtype=dtype, shape=(n, n)
+        )
+
+        for start, tile in self.tiles(dtype, max_bytes):
+            covariance_matrix[start : start + len(tile)] = tile
+
+        covariance_matrix.flush()
+        return covariance_matrix
+
+    def write_parquet(
+        self,
+        path: str | Path,
+        date_: dt.date,
+        key: str = "ticker",
+        dtype: np.dtype = np.float64,
+        max_bytes: int = 2 * 1024**3,
+    ) -> None:
+        """
+        Stream Σ to a parquet file of (date, key, *ids) rows, one row group
+        per tile, in the layout of the dense covariance matrix output.
+        """
+        value_type = pa.from_numpy_dtype(np.dtype(dtype))
+        schema = pa.schema(
+            [("date", pa.date32()), (key, pa.string())]
+            + [(id_, value_type) for id_ in self.ids]
+        )
+
+        with pq.ParquetWriter(path, schema) as writer:
+            for start, tile in self.tiles(dtype, max_bytes):
+                rows = len(tile)
+
+                # Parquet is columnar, so lay the tile out column by column
+                columns = np.ascontiguousarray(tile.T)
+
+                writer.write_table(
+                    pa.Table.from_arrays(
+                        [
+                            pa.array([date_] * rows, pa.date32()),
+                            pa.array(self.ids[start : start + rows], pa.string()),
+                            *(pa.array(column) for column in columns),
+                        ],
+                        schema=schema,
+                    )
+                )
@@ -79,3 +79,10 @@ factors = sorted(
         "USSLOWL_WIRELESS",
     ]
 )
+
+# Upper triangle of a factor covariance matrix, row by row as in np.triu_indices
+packed_factor_pairs = [
+    (factor_1, factor_2)
+    for i, factor_1 in enumerate(factors)
+    for factor_2 in factors[i:]
+]
@@ -0,0 +1,146 @@
+import datetime as dt
+import polars as pl
+from collections import defaultdict
+from tqdm import tqdm
+from sf_data_pipelines.utils.tables import IntervalTable, Table, TableBuilder
+
+
+def changed_years(
+    previous_df: pl.DataFrame | None,
+    current_df: pl.DataFrame,
+    by: str = "barrid",
+    start: str = "start_date",
+    end: str = "end_date",
+) -> set[int]:
+    """
+    Years whose backward as-of join against an identity file has changed.
+
+    A backward as-of join only looks at interval starts, so end dates are
+    ignored. A row added or removed at (barrid, start) changes the joined
+    values from `start` until the barrid's next interval start, in either
+    the previous or the current file, or until today if there is none.
+
+    Args:
+        previous_df: Identity file from the last run, None on the first run
+        current_df: Identity file from this run
+        by: Column the as-of join is grouped by
+        start: Interval start column
+        end: Interval end column
+
+    Returns:
+        Years to rewrite
+    """
+    today = dt.date.today()
+
+    if previous_df is None:
+        min_date = current_df[start].min()
+        max_date = min(current_df[end].max(), today)
+        return set(range(min_date.year, max_date.year + 1))
+
+    columns = [
+        col for col in current_df.columns if col != end and col in previous_df.columns
+    ]
+    previous_df = previous_df.select(columns)
+    current_df = current_df.select(columns)
+
+    changed = (
+        pl.concat(
+            [
+                current_df.join(previous_df, on=columns, how="anti", nulls_equal=True),
+                previous_df.join(current_df, on=columns, how="anti", nulls_equal=True),
+            ]
+        )
+        .select(by, start)
+        .unique()
+    )
+
+    if changed.is_empty():
+        return set()
+
+    intervals = (
+        pl.concat([previous_df.select(by, start), current_df.select(by, start)])
+        .unique()
+        .sort(by, start)
+        .with_columns(pl.col(start).shift(-1).over(by).alias("next_start"))
+    )
+
+    years = (
+        changed.join(intervals, on=[by, start], how="left")
+        .with_columns(
+            pl.min_horizontal(
+                pl.col("next_start").fill_null(today), pl.lit(today)
+            ).alias("affected_end")
+        )
+        .filter(pl.col(start).le(pl.col("affected_end")))
+        .select(
+            pl.int_ranges(
+                pl.col(start).dt.year(), pl.col("affected_end").dt.year() + 1
+            )
+            .explode()
+            .unique()
+            .alias("year")
+        )
+    )
+
+    return set(years["year"].to_list())
+
+
+def materialize_intervals(
+    assets_table: Table | TableBuilder,
+    interval_table: IntervalTable,
+    intervals: pl.DataFrame,
+    refresh_years: list[int] | None = None,
+    materialize: bool = True,
+    desc: str | None = None,
+    refresh_dates: list[dt.date] | None = None,
+) -> None:
+    """
+    Store identity intervals and join them as of date into the assets table.
+
+    Only years whose as-of join changed since the intervals were last
+    materialized are rewritten, plus `refresh_years`, and the files holding
+    `refresh_dates` in the other years. The interval table and
+    the materialized intervals are only written once the assets writes are
+    on disk, and the materialized intervals only move when they were joined,
+    so a failed or skipped rewrite is picked up again by the next run.
+
+    Args:
+        assets_table: Assets table, or a builder staging its writes
+        interval_table: Interval table the intervals are stored in
+        intervals: Cleaned (barrid, start_date, end_date, ...) intervals
+        refresh_years: Years to rewrite even if their intervals are unchanged
+        materialize: Join the attributes into the assets table
+        desc: Progress bar label
+        refresh_dates: Dates that just gained asset rows
+    """
+    if materialize:
+        years = changed_years(interval_table.read_materialized(), intervals) | set(
+            refresh_years or []
+        )
+
+        # Years that are not rewritten whole only refresh their new dates
+        refresh = defaultdict(list)
+        for date_ in refresh_dates or []:
+            if date_.year not in years:
+                refresh[date_.year].append(date_)
+
+        # Years without asset files are skipped when the joins are applied
+        for year in tqdm(sorted(years | set(refresh)), desc=desc):
+            assets_table.update_asof(
+                year=year,
+                right_df=intervals,
+                left_on="date",
+                right_on="start_date",
+                by="barrid",
+                strategy="backward",
+                drop_right_cols=["start_date", "end_date"],
+                dates=refresh.get(year),
+            )
+
+    def write_intervals() -> None:
+        interval_table.write(intervals)
+
+        if materialize:
+            interval_table.write_materialized(intervals)
+
+    assets_table.on_written(write_intervals)
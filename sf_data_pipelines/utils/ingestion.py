@@ -0,0 +1,161 @@
+import os
+import polars as pl
+from collections import defaultdict
+from datetime import date
+from itertools import repeat
+from pathlib import Path
+from sf_data_pipelines.utils.barra_datasets import BarraDataset
+from sf_data_pipelines.utils.cache import MemberCache
+from sf_data_pipelines.utils.enums import Executor
+from sf_data_pipelines.utils.extraction import get_pool, read_zip_members
+from sf_data_pipelines.utils.manifest import IngestionManifest
+from sf_data_pipelines.utils.tables import Table
+
+
+class DailyIngestion:
+    """
+    Read the daily Barra zip folders for a set of dates, opening each zip once.
+
+    Datasets register before `run`. Every zip folder is then opened a single
+    time and only the members of registered datasets are decompressed, so
+    datasets that share a zip folder share the read.
+
+    With a manifest, dates that were already loaded from an unchanged zip
+    folder are skipped unless `reload` is set, and `commit` records the
+    dates a flow has written. A dataset that only updates existing rows of
+    a target table is recorded once the target has rows on its dates, so
+    a file that arrives before the rows it updates is read again.
+    """
+
+    def __init__(
+        self,
+        dates: list[date],
+        workers: int | None = None,
+        executor: Executor = Executor.THREAD,
+        manifest: IngestionManifest | None = None,
+        reload: bool = False,
+    ) -> None:
+        self._dates = dates
+        self._workers = workers
+        self._executor = executor
+        self._manifest = manifest
+        self._reload = reload
+
+        self._datasets: dict[str, tuple[BarraDataset, bool]] = {}
+        self._targets: dict[str, Table] = {}
+        self._frames: dict[str, pl.DataFrame] = {}
+        self._stats: dict[str, dict[date, tuple[str, int, int]]] = {}
+
+    def register(
+        self,
+        dataset: BarraDataset,
+        latest_only: bool = False,
+        target: Table | None = None,
+    ) -> None:
+        """
+        Read `dataset` on every date, or only on the latest available date.
+
+        `target` is the table whose existing rows the dataset updates.
+        """
+        self._datasets[dataset.file_name()] = (dataset, latest_only)
+
+        if target is not None:
+            self._targets[dataset.file_name()] = target
+
+    def _members(self) -> dict[Path, list[tuple[str, date, BarraDataset]]]:
+        members = defaultdict(list)
+
+        for key, (dataset, latest_only) in self._datasets.items():
+            dates = [
+                date_
+                for date_ in self._dates
+                if os.path.exists(dataset.daily_zip_folder_path(date_))
+            ]
+
+            if latest_only:
+                dates = dates[-1:]
+
+            if self._manifest is not None and not self._reload:
+                dates = self._manifest.pending(dataset, dates)
+
+            self._stats[key] = {
+                date_: IngestionManifest.stat(dataset, date_) for date_ in dates
+            }
+
+            for date_ in dates:
+                members[dataset.daily_zip_folder_path(date_)].append(
+                    (key, date_, dataset)
+                )
+
+        return members
+
+    def run(self) -> None:
+        members = self._members()
+        zip_folder_paths = list(members)
+        cache = MemberCache()
+
+        with get_pool(self._executor, self._workers) as pool:
+            results = pool.map(
+                read_zip_members,
+                zip_folder_paths,
+                [
+                    [
+                        (dataset.file_name(date_), dataset.skip_rows)
+                        for _, date_, dataset in members[zip_folder_path]
+                    ]
+                    for zip_folder_path in zip_folder_paths
+                ],
+                repeat(None),
+                repeat(cache),
+            )
+
+            dfs = defaultdict(list)
+            for zip_folder_path, folder_dfs in zip(zip_folder_paths, results):
+                for (key, date_, _), df in zip(members[zip_folder_path], folder_dfs):
+                    dfs[key].append((date_, df))
+
+        for key in self._datasets:
+            key_dfs = [df for _, df in sorted(dfs[key], key=lambda item: item[0])]
+            self._frames[key] = pl.concat(key_dfs) if key_dfs else pl.DataFrame()
+
+    def pop(self, dataset: BarraDataset) -> pl.DataFrame:
+        """Hand over the frame read for `dataset` and release it from the stage."""
+        return self._frames.pop(dataset.file_name())
+
+    def _target_dates(self, key: str, dates: list[date]) -> set[date]:
+        """Dates among `dates` on which the target of `key` has rows."""
+        return set(
+            self._targets[key]
+            .read(start=min(dates), end=max(dates), columns=["date"])
+            .unique()
+            .collect()["date"]
+        )
+
+    def commit(self) -> None:
+        """Record every date read so far as loaded in the manifest."""
+        if self._manifest is not None:
+            for key, (dataset, _) in self._datasets.items():
+                stats = self._stats.get(key, {})
+
+                # Dates with no rows to update yet are read again next run
+                if key in self._targets and stats:
+                    target_dates = self._target_dates(key, list(stats))
+                    stats = {
+                        date_: stat
+                        for date_, stat in stats.items()
+                        if date_ in target_dates
+                    }
+
+                self._manifest.record(dataset, stats)
+
+        self._stats.clear()
+
+
+def load_daily_files(
+    dataset: BarraDataset, dates: list[date], latest_only: bool = False
+) -> pl.DataFrame:
+    ingestion = DailyIngestion(dates)
+    ingestion.register(dataset, latest_only)
+    ingestion.run()
+
+    return ingestion.pop(dataset)
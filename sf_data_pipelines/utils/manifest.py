@@ -0,0 +1,118 @@
+import contextlib
+import datetime as dt
+import fcntl
+import os
+import polars as pl
+import tempfile
+from collections.abc import Iterator
+from datetime import date
+from sf_data_pipelines.utils.barra_datasets import BarraDataset
+
+manifest_schema = {
+    "dataset": pl.String,
+    "date": pl.Date,
+    "zip_folder_path": pl.String,
+    "size": pl.Int64,
+    "mtime_ns": pl.Int64,
+    "loaded_at": pl.Datetime,
+}
+
+
+class IngestionManifest:
+    """
+    Watermarks of the daily Barra files loaded into a database.
+
+    One row per (dataset, date) records the size and mtime of the zip folder
+    the date was loaded from, so daily runs can skip files that are already
+    loaded and pick up files the vendor has since replaced.
+
+    Updates hold an exclusive lock on the manifest, like the catalog, so
+    concurrent runs never drop each other's watermarks.
+    """
+
+    def __init__(self, base_path: str) -> None:
+        self._file_path = f"{base_path}/_manifests/barra_daily.parquet"
+        self._lock_path = f"{self._file_path}.lock"
+
+        os.makedirs(os.path.dirname(self._file_path), exist_ok=True)
+
+    def read(self) -> pl.DataFrame:
+        if not os.path.exists(self._file_path):
+            return pl.DataFrame(schema=manifest_schema)
+
+        return pl.read_parquet(self._file_path)
+
+    @contextlib.contextmanager
+    def _locked(self) -> Iterator[None]:
+        """Hold the manifest lock for a read-modify-write."""
+        with open(self._lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _write(self, df: pl.DataFrame) -> None:
+        # Write then rename so a crash never leaves a truncated manifest
+        with tempfile.NamedTemporaryFile(
+            dir=os.path.dirname(self._file_path), suffix=".tmp", delete=False
+        ) as temp_file:
+            temp_path = temp_file.name
+
+        try:
+            df.sort("dataset", "date").write_parquet(temp_path)
+            os.replace(temp_path, self._file_path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+    @staticmethod
+    def stat(dataset: BarraDataset, date_: date) -> tuple[str, int, int]:
+        zip_folder_path = dataset.daily_zip_folder_path(date_)
+        stat = os.stat(zip_folder_path)
+
+        return str(zip_folder_path), stat.st_size, stat.st_mtime_ns
+
+    def loaded(self, dataset: BarraDataset) -> dict[date, tuple[str, int, int]]:
+        """Map each loaded date of `dataset` to the file stats it was loaded from."""
+        df = self.read().filter(pl.col("dataset").eq(dataset.file_name()))
+
+        return {
+            row["date"]: (row["zip_folder_path"], row["size"], row["mtime_ns"])
+            for row in df.iter_rows(named=True)
+        }
+
+    def pending(self, dataset: BarraDataset, dates: list[date]) -> list[date]:
+        """Dates whose zip folder exists and is new or changed since it was loaded."""
+        loaded = self.loaded(dataset)
+
+        return [
+            date_
+            for date_ in dates
+            if os.path.exists(dataset.daily_zip_folder_path(date_))
+            and loaded.get(date_) != self.stat(dataset, date_)
+        ]
+
+    def record(
+        self, dataset: BarraDataset, stats: dict[date, tuple[str, int, int]]
+    ) -> None:
+        if not stats:
+            return
+
+        rows = pl.DataFrame(
+            [
+                {
+                    "dataset": dataset.file_name(),
+                    "date": date_,
+                    "zip_folder_path": zip_folder_path,
+                    "size": size,
+                    "mtime_ns": mtime_ns,
+                    "loaded_at": dt.datetime.now(),
+                }
+                for date_, (zip_folder_path, size, mtime_ns) in stats.items()
+            ],
+            schema=manifest_schema,
+        )
+
+        with self._locked():
+            self._write(self.read().update(rows, on=["dataset", "date"], how="full"))
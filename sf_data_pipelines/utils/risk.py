@@ -0,0 +1,154 @@
+import numpy as np
+import polars as pl
+from datetime import date
+from sf_data_pipelines.utils.covariances import read_factor_covariances
+from sf_data_pipelines.utils.factors import factors
+from sf_data_pipelines.utils.tables import Database
+
+
+def portfolio_risk(
+    database: Database,
+    weights: pl.DataFrame,
+    start: date | None = None,
+    end: date | None = None,
+    portfolio: str = "signal",
+    weight: str = "weight",
+) -> pl.DataFrame:
+    """
+    Predicted risk of many portfolios on many dates in one pass.
+
+    Portfolio factor exposures B = X'W are aggregated with one join and
+    group-by over every (date, portfolio), then the factor risk of every
+    portfolio on every date is computed at once against the stacked factor
+    covariances with einsum. Σ is never formed.
+
+    Factor contributions are Euler contributions to total risk,
+    b_k (F b)_k / σ, so they sum with `specific_contribution` to
+    `total_risk`.
+
+    Holdings without exposures add nothing to the factor risk, and holdings
+    without a specific risk add nothing to the specific risk. Their absolute
+    weight is reported in `uncovered_weight` so understated risk is visible.
+
+    Args:
+        database: Database with the exposures, covariances and assets tables
+        weights: Frame of (date, barrid, portfolio, weight) rows, such as
+            the active_weights table
+        start: First date to analyze
+        end: Last date to analyze
+        portfolio: Column identifying the portfolio
+        weight: Column holding the weights
+
+    Returns:
+        DataFrame of (date, portfolio, total_risk, factor_risk, specific_risk,
+        specific_contribution, uncovered_weight, *factors) rows in decimal
+        units, for the dates that have a factor covariance matrix
+    """
+    if start is not None:
+        weights = weights.filter(pl.col("date").ge(start))
+    if end is not None:
+        weights = weights.filter(pl.col("date").le(end))
+
+    weights = weights.select("date", "barrid", portfolio, weight).filter(
+        pl.col(weight).is_not_null()
+    )
+
+    if weights.is_empty():
+        return pl.DataFrame()
+
+    start = start or weights["date"].min()
+    end = end or weights["date"].max()
+    barrids = weights["barrid"].unique().to_list()
+
+    exposures = database.exposures_table.read(
+        start=start, end=end, columns=["date", "barrid", *factors], barrids=barrids
+    ).with_columns(pl.lit(True).alias("has_exposures"))
+    specific_risk = database.assets_table.read(
+        start=start,
+        end=end,
+        columns=["date", "barrid", "specific_risk"],
+        barrids=barrids,
+    )
+
+    # B = X'W and the specific variance of every (date, portfolio)
+    portfolio_exposures = (
+        weights.lazy()
+        .join(exposures, on=["date", "barrid"], how="left")
+        .join(specific_risk, on=["date", "barrid"], how="left")
+        .group_by("date", portfolio)
+        .agg(
+            *[
+                pl.col(factor).fill_null(0).mul(pl.col(weight)).sum()
+                for factor in factors
+            ],
+            pl.col("specific_risk")
+            .truediv(100)
+            .mul(pl.col(weight))
+            .pow(2)
+            .sum()
+            .alias("specific_variance"),
+            pl.col(weight)
+            .abs()
+            .filter(
+                pl.col("has_exposures").is_null() | pl.col("specific_risk").is_null()
+            )
+            .sum()
+            .alias("uncovered_weight"),
+        )
+        .collect()
+    )
+
+    dates, factor_covariances = read_factor_covariances(database, start, end)
+    factor_covariances = factor_covariances / 100**2
+
+    portfolios = portfolio_exposures[portfolio].unique().sort().to_list()
+
+    # Scatter B into a dense (T, P, K) array, zero where a portfolio has no
+    # holdings on a date
+    portfolio_exposures = portfolio_exposures.join(
+        pl.DataFrame({"date": dates, "date_index": range(len(dates))}),
+        on="date",
+        how="inner",
+    ).join(
+        pl.DataFrame(
+            {portfolio: portfolios, "portfolio_index": range(len(portfolios))}
+        ),
+        on=portfolio,
+        how="inner",
+    )
+
+    date_index = portfolio_exposures["date_index"].to_numpy()
+    portfolio_index = portfolio_exposures["portfolio_index"].to_numpy()
+
+    b = np.zeros((len(dates), len(portfolios), len(factors)))
+    b[date_index, portfolio_index] = portfolio_exposures.select(factors).to_numpy()
+
+    # (F b) for every date and portfolio, then b_k (F b)_k
+    marginal = np.einsum("tkl,tpl->tpk", factor_covariances, b)
+    factor_contributions = b * marginal
+
+    factor_variance = factor_contributions.sum(axis=2)[date_index, portfolio_index]
+    specific_variance = portfolio_exposures["specific_variance"].to_numpy()
+    total_risk = np.sqrt(factor_variance + specific_variance)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        contributions = (
+            factor_contributions[date_index, portfolio_index] / total_risk[:, None]
+        )
+        specific_contribution = specific_variance / total_risk
+
+    return (
+        pl.DataFrame(
+            {
+                "date": portfolio_exposures["date"],
+                portfolio: portfolio_exposures[portfolio],
+                "total_risk": total_risk,
+                "factor_risk": np.sqrt(factor_variance),
+                "specific_risk": np.sqrt(specific_variance),
+                "specific_contribution": specific_contribution,
+                "uncovered_weight": portfolio_exposures["uncovered_weight"],
+            }
+        )
+        .with_columns(pl.from_numpy(contributions, factors))
+        .sort("date", portfolio)
+    )
@@ -26,6 +26,12 @@ def get_file(bucket_name: str, file_key: str) -> pl.DataFrame:
     return pl.read_csv(StringIO(file_content))
 
 
+def get_parquet(bucket_name: str, file_key: str) -> pl.DataFrame:
+    s3_object = client.get_object(Bucket=bucket_name, Key=file_key)
+
+    return pl.read_parquet(BytesIO(s3_object["Body"].read()))
+
+
 def drop_file(file_name: str, bucket_name: str, file_data: pl.DataFrame) -> None:
     csv_buffer = StringIO()
 
@@ -46,6 +52,10 @@ def write_parquet(file_name: str, bucket_name: str, file_data: pl.DataFrame) ->
     client.upload_fileobj(parquet_buffer, bucket_name, file_name)
 
 
+def upload_file(file_path: str, bucket_name: str, file_name: str) -> None:
+    client.upload_file(file_path, bucket_name, file_name)
+
+
 def list_files(bucket_name: str):
     file_paths = []
 
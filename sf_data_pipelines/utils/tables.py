@@ -1,9 +1,104 @@
+import glob
 import polars as pl
 import os
+import shutil
+from collections import defaultdict
+from datetime import date, timedelta
 from dotenv import load_dotenv
-from sf_data_pipelines.utils.factors import factors
-from typing import Optional
-from sf_data_pipelines.utils.enums import DatabaseName
+from pathlib import Path
+from tqdm import tqdm
+from sf_data_pipelines.utils.factors import factors, packed_factor_pairs
+from typing import Callable, Optional
+from sf_data_pipelines.utils.catalog import Catalog
+from sf_data_pipelines.utils.enums import DatabaseName, Partitioning
+from sf_data_pipelines.utils.manifest import IngestionManifest
+from sf_data_pipelines.utils.tensors import CovarianceTensor, ExposuresTensor
+
+
+def database_path(database: DatabaseName) -> str:
+    load_dotenv(override=True)
+    home, user = os.getenv("ROOT").split("/")[1:3]
+    return f"/{home}/{user}/groups/grp_quant/database/{database.value}"
+
+
+def join_asof_coalesce(
+    left_df: pl.LazyFrame,
+    right_df: pl.DataFrame,
+    left_on: str,
+    right_on: str,
+    by: str | list[str],
+    strategy: str = 'backward',
+    drop_right_cols: list[str] | None = None
+) -> pl.LazyFrame:
+    """
+    Perform join_asof with intelligent column conflict handling.
+    
+    Overlapping columns are coalesced (preferring right_df values).
+    Columns unique to either DataFrame are preserved.
+    
+    Args:
+        left_df: Left DataFrame
+        right_df: Right DataFrame to join
+        left_on: Temporal column in left_df
+        right_on: Temporal column in right_df
+        by: Column(s) to join on
+        strategy: Join strategy ('backward', 'forward', 'nearest')
+        drop_right_cols: Columns from right_df to exclude from result
+    
+    Returns:
+        Joined DataFrame with resolved column conflicts
+    """
+    if drop_right_cols is None:
+        drop_right_cols = []
+    
+    on = by if isinstance(by, list) else [by]
+    on_with_left = on + [left_on]
+    
+    left_cols = set(left_df.collect_schema().names())
+    right_cols = set(right_df.collect_schema().names())
+    
+    right_cols_to_keep = right_cols - set(drop_right_cols) - {right_on}
+    
+    # Columns in both DataFrames get suffix '_updated' during join
+    overlap_cols = (left_cols & right_cols_to_keep) - set(on_with_left)
+    
+    # Columns unique to each DataFrame
+    left_only_cols = left_cols - right_cols_to_keep - set(on_with_left)
+    right_only_cols = right_cols_to_keep - left_cols - set(on)
+
+    joined = (
+        left_df
+        .sort(*on, left_on)
+        .join_asof(
+            other=right_df.lazy().sort(*on, right_on),
+            left_on=left_on,
+            right_on=right_on,
+            by=by,
+            strategy=strategy,
+            suffix='_updated',
+            check_sortedness=False
+        )
+    )
+    
+    select_exprs = on_with_left.copy()
+    
+    # Coalesce overlapping columns (prefer right_df)
+    for col in sorted(overlap_cols):
+        select_exprs.append(pl.coalesce(f"{col}_updated", col).alias(col))
+    
+    # Keep left-only columns
+    for col in sorted(left_only_cols):
+        select_exprs.append(pl.col(col))
+    
+    # Keep right-only columns (no suffix added by join)
+    for col in sorted(right_only_cols):
+        select_exprs.append(pl.col(col))
+
+    return joined.select(select_exprs)
+
+
+# (kind, rows, kwargs) staged against a table, see Table.apply
+Operation = tuple[str, pl.DataFrame, dict]
 
 
 class Table:
@@ -14,15 +109,40 @@ class Table:
         schema: dict[str, pl.DataType],
         ids=list[str],
     ) -> None:
-        load_dotenv(override=True)
-        home, user = os.getenv("ROOT").split("/")[1:3]
-        self._base_path = f"/{home}/{user}/groups/grp_quant/database/{database.value}"
+        self._base_path = database_path(database)
 
         self._name = name
         self._schema = schema
         self._ids = ids
+        self._catalog = Catalog(self._base_path)
 
-        os.makedirs(f"{self._base_path}/{self._name}", exist_ok=True)
+        os.makedirs(self._table_path(), exist_ok=True)
+
+        self._partitioning = self._read_partitioning()
+
+    def _table_path(self) -> str:
+        return f"{self._base_path}/{self._name}"
+
+    def _read_partitioning(self) -> Partitioning:
+        partitioning_path = f"{self._table_path()}/_partitioning"
+
+        if not os.path.exists(partitioning_path):
+            return Partitioning.YEAR
+
+        with open(partitioning_path) as file:
+            return Partitioning(file.read().strip())
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def schema(self) -> dict[str, pl.DataType]:
+        return self._schema
+
+    @property
+    def partitioning(self) -> Partitioning:
+        return self._partitioning
 
     def _file_path(self, year: int | None = None) -> str:
         if year is not None:
@@ -30,37 +150,321 @@ class Table:
         else:
             return f"{self._base_path}/{self._name}/{self._name}_*.parquet"
 
+    def _files(self, year: int | None = None) -> list[str]:
+        if self._partitioning == Partitioning.YEAR:
+            return sorted(glob.glob(self._file_path(year)))
+
+        year_pattern = "*" if year is None else year
+        return sorted(
+            glob.glob(f"{self._table_path()}/year={year_pattern}/*/data.parquet")
+        )
+
+    def _file_year(self, path: str) -> int:
+        if self._partitioning == Partitioning.YEAR:
+            return int(Path(path).stem.removeprefix(f"{self._name}_"))
+
+        return int(Path(path).parent.parent.name.removeprefix("year="))
+
+    def _partition_path(self, date_: date) -> str:
+        year_path = f"{self._table_path()}/year={date_.year}"
+        month_path = f"{year_path}/month={date_.month:02d}/data.parquet"
+
+        # Daily partitions are appended until their month is compacted
+        if self._partitioning == Partitioning.DATE and not os.path.exists(month_path):
+            return f"{year_path}/date={date_.isoformat()}/data.parquet"
+
+        return month_path
+
+    def _partitions(self, rows: pl.DataFrame) -> dict[str, pl.DataFrame]:
+        dates = defaultdict(list)
+        for date_ in rows["date"].drop_nulls().unique().sort():
+            dates[self._partition_path(date_)].append(date_)
+
+        return {
+            path: rows.filter(pl.col("date").is_in(path_dates))
+            for path, path_dates in dates.items()
+        }
+
+    def _catalog_file(self, path: str) -> str:
+        return os.path.relpath(path, self._table_path())
+
+    def _write(self, df: pl.DataFrame, path: str) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Write then rename so readers never see a partial file
+        temp_path = f"{path}.tmp"
+        df.write_parquet(temp_path)
+        os.replace(temp_path, path)
+
+        self._catalog.record(self._name, self._catalog_file(path), df)
+
+    def _remove(self, paths: list[str]) -> None:
+        for path in paths:
+            if self._partitioning == Partitioning.YEAR:
+                os.remove(path)
+            else:
+                shutil.rmtree(Path(path).parent)
+
+        self._catalog.remove(self._name, [self._catalog_file(path) for path in paths])
+
+    def _rewrite(
+        self, path: str, plan: Callable[[pl.LazyFrame], pl.LazyFrame]
+    ) -> None:
+        current = (
+            pl.scan_parquet(path)
+            if os.path.exists(path)
+            else pl.LazyFrame(schema=self._schema)
+        )
+        self._write(plan(current).collect(), path)
+
     def exists(self, year: int) -> bool:
-        return os.path.exists(self._file_path(year))
+        return len(self._files(year)) > 0
 
     def create_if_not_exists(self, year: int) -> None:
+        # Partitioned tables create their partitions on write
+        if self._partitioning != Partitioning.YEAR:
+            return
+
         if not os.path.exists(self._file_path(year)):
-            pl.DataFrame(schema=self._schema).write_parquet(self._file_path(year))
+            self._write(pl.DataFrame(schema=self._schema), self._file_path(year))
+
+    def _file_dates(self, path: str) -> tuple[date, date]:
+        """First and last date a file can hold, from its name alone."""
+        year = self._file_year(path)
+        partition = Path(path).parent.name
+
+        if self._partitioning == Partitioning.YEAR:
+            return date(year, 1, 1), date(year, 12, 31)
 
-    def read(self, year: int | None = None) -> pl.LazyFrame:
-        if year is None:
-            return pl.scan_parquet(self._file_path())
+        if partition.startswith("date="):
+            date_ = date.fromisoformat(partition.removeprefix("date="))
+            return date_, date_
+
+        month = int(partition.removeprefix("month="))
+        next_month = date(year + month // 12, month % 12 + 1, 1)
+        return date(year, month, 1), next_month - timedelta(days=1)
+
+    def read(
+        self,
+        year: int | None = None,
+        start: date | None = None,
+        end: date | None = None,
+        columns: list[str] | None = None,
+        barrids: list[str] | None = None,
+    ) -> pl.LazyFrame:
+        """
+        Scan the table, opening only the files that can match the predicates.
+
+        Files are chosen from their catalog date range, or from their year or
+        partition when the catalog has no current entry, before anything is
+        scanned. Empty files are skipped. The date range, barrid filter and
+        column projection are applied directly on the scan so they are pushed
+        into the reader.
+
+        Args:
+            year: Only read this year
+            start: First date to read
+            end: Last date to read
+            columns: Columns to return, defaults to every column
+            barrids: Barrids to read, defaults to all
+
+        Returns:
+            LazyFrame over the selected files, empty if none match
+        """
+        entries = self._catalog.entries(self._name)
+
+        files = []
+        for path in self._files(year):
+            entry = entries.get(path)
+
+            if entry is not None and entry["rows"] == 0:
+                continue
+
+            if entry is not None and entry["min_date"] is not None:
+                first, last = entry["min_date"], entry["max_date"]
+            else:
+                first, last = self._file_dates(path)
+
+            if (start is None or last >= start) and (end is None or first <= end):
+                files.append(path)
+
+        if not files:
+            df = pl.LazyFrame(schema=self._schema)
         else:
-            return pl.scan_parquet(self._file_path(year))
+            df = pl.scan_parquet(files, hive_partitioning=False)
 
-    def upsert(self, year: int, rows: pl.DataFrame) -> None:
-        (
-            pl.scan_parquet(self._file_path(year))
-            .update(rows.lazy(), on=self._ids, how="full")
-            .collect()
-            .write_parquet(self._file_path(year))
+        if start is not None:
+            df = df.filter(pl.col("date").ge(start))
+        if end is not None:
+            df = df.filter(pl.col("date").le(end))
+        if barrids is not None:
+            df = df.filter(pl.col("barrid").is_in(barrids))
+        if columns is not None:
+            df = df.select(columns)
+
+        return df
+
+    def max_date(self, column: str | None = None) -> date | None:
+        """
+        Last date stored in the table, or the last date on which `column` is set.
+
+        Without `column` the date comes from the catalog, so only files with
+        no current entry are opened. With `column` the files are scanned
+        newest first, stopping at the first one where the column has a value.
+        """
+        entries = self._catalog.entries(self._name)
+        files = self._files()
+
+        if column is None:
+            dates = [entries[path]["max_date"] for path in files if path in entries]
+            stale = [path for path in files if path not in entries]
+
+            if stale:
+                dates.append(
+                    pl.scan_parquet(stale, hive_partitioning=False)
+                    .select(pl.col("date").max())
+                    .collect()
+                    .item()
+                )
+
+            return max((date_ for date_ in dates if date_ is not None), default=None)
+
+        for path in sorted(files, key=self._file_dates, reverse=True):
+            entry = entries.get(path)
+
+            if entry is not None and entry["rows"] == 0:
+                continue
+
+            if column not in pl.read_parquet_schema(path):
+                continue
+
+            max_date = (
+                pl.scan_parquet(path, hive_partitioning=False)
+                .filter(pl.col(column).is_not_null())
+                .select(pl.col("date").max())
+                .collect()
+                .item()
+            )
+
+            if max_date is not None:
+                return max_date
+
+        return None
+
+    def _partition_filter(self, path: str) -> pl.Expr:
+        if self._partitioning == Partitioning.YEAR:
+            return pl.lit(True)
+
+        partition = Path(path).parent.name
+
+        if partition.startswith("date="):
+            return pl.col("date").eq(date.fromisoformat(partition.removeprefix("date=")))
+
+        return pl.col("date").dt.year().eq(self._file_year(path)) & pl.col(
+            "date"
+        ).dt.month().eq(int(partition.removeprefix("month=")))
+
+    def _operation_paths(self, year: int, operations: list[Operation]) -> list[str]:
+        if self._partitioning == Partitioning.YEAR:
+            path = self._file_path(year)
+
+            # Only upserts add rows, so a missing file is left to them
+            upserts = any(kind == "upsert" for kind, _, _ in operations)
+            return [path] if upserts or os.path.exists(path) else []
+
+        paths = set()
+        for kind, rows, kwargs in operations:
+            match kind:
+                case "upsert":
+                    paths |= set(self._partitions(rows))
+                case "update":
+                    # Left updates never add rows, so missing partitions are skipped
+                    paths |= {
+                        path for path in self._partitions(rows) if os.path.exists(path)
+                    }
+                case "update_asof" if kwargs.get("dates") is not None:
+                    # Only the partitions holding the refreshed dates
+                    dates = pl.DataFrame(
+                        {"date": kwargs["dates"]}, schema={"date": pl.Date}
+                    )
+                    paths |= {
+                        path for path in self._partitions(dates) if os.path.exists(path)
+                    }
+                case "update_asof":
+                    paths |= set(self._files(year))
+
+        return sorted(paths)
+
+    def _plan(
+        self, lf: pl.LazyFrame, operations: list[Operation], where: pl.Expr
+    ) -> pl.LazyFrame:
+        for kind, rows, kwargs in operations:
+            match kind:
+                case "upsert":
+                    lf = lf.update(
+                        rows.lazy().filter(where), on=self._ids, how="full"
+                    )
+                case "update":
+                    lf = lf.update(
+                        rows.lazy().filter(where),
+                        on=kwargs.get("on") or self._ids,
+                        how="left",
+                    )
+                case "update_asof":
+                    join_kwargs = {
+                        key: value for key, value in kwargs.items() if key != "dates"
+                    }
+                    lf = join_asof_coalesce(lf, rows, **join_kwargs)
+
+        return lf
+
+    def _unchanged(self, entry: dict | None, operations: list[Operation]) -> bool:
+        """Whether the operations provably leave a cataloged file as it is."""
+        if entry is None or any(kind == "upsert" for kind, _, _ in operations):
+            return False
+
+        # Updates never add rows, so an empty file stays empty
+        if entry["rows"] == 0:
+            return True
+
+        # Left updates only touch the dates they carry
+        return entry["min_date"] is not None and all(
+            kind == "update"
+            and rows.filter(
+                pl.col("date").is_between(entry["min_date"], entry["max_date"])
+            ).is_empty()
+            for kind, rows, _ in operations
         )
 
+    def apply(self, year: int, operations: list[Operation]) -> None:
+        """
+        Merge several operations into the files of `year` in one pass.
+
+        Each affected file is read once, every operation is applied in order
+        in a single lazy plan, and the result is written once. Files the
+        catalog shows the operations cannot change are not opened at all.
+
+        Args:
+            year: Year whose files are rewritten
+            operations: (kind, rows, kwargs) tuples, where kind is "upsert",
+                "update" or "update_asof" and kwargs are that method's options
+        """
+        entries = self._catalog.entries(self._name)
+
+        for path in self._operation_paths(year, operations):
+            if self._unchanged(entries.get(path), operations):
+                continue
+
+            where = self._partition_filter(path)
+            self._rewrite(path, lambda lf: self._plan(lf, operations, where))
+
+    def upsert(self, year: int, rows: pl.DataFrame) -> None:
+        self.apply(year, [("upsert", rows, {})])
+
     def update(
         self, year: int, rows: pl.DataFrame, on: Optional[list[str]] = None
     ) -> None:
-        on = on or self._ids
-        (
-            pl.scan_parquet(self._file_path(year))
-            .update(rows.lazy(), on=on, how="left")
-            .collect()
-            .write_parquet(self._file_path(year))
-        )
+        self.apply(year, [("update", rows, {"on": on})])
 
     def update_asof(
         self,
@@ -70,81 +474,365 @@ class Table:
         right_on: str,
         by: str | list[str],
         strategy: str = 'backward',
-        drop_right_cols: list[str] | None = None
-    ) -> pl.DataFrame:
+        drop_right_cols: list[str] | None = None,
+        dates: list[date] | None = None,
+    ) -> None:
         """
-        Perform join_asof with intelligent column conflict handling.
-        
-        Overlapping columns are coalesced (preferring right_df values).
-        Columns unique to either DataFrame are preserved.
-        
-        Args:
-            left_df: Left DataFrame
-            right_df: Right DataFrame to join
-            left_on: Temporal column in left_df
-            right_on: Temporal column in right_df
-            by: Column(s) to join on
-            strategy: Join strategy ('backward', 'forward', 'nearest')
-            drop_right_cols: Columns from right_df to exclude from result
-        
-        Returns:
-            Joined DataFrame with resolved column conflicts
+        Join `right_df` as of `left_on` into every file of `year`, or only
+        into the files holding `dates`.
         """
-        left_df = pl.scan_parquet(self._file_path(year))
-
-        if drop_right_cols is None:
-            drop_right_cols = []
-        
-        on = by if isinstance(by, list) else [by]
-        on_with_left = on + [left_on]
-        
-        left_cols = set(left_df.collect_schema().names())
-        right_cols = set(right_df.collect_schema().names())
-        
-        right_cols_to_keep = right_cols - set(drop_right_cols) - {right_on}
-        
-        # Columns in both DataFrames get suffix '_updated' during join
-        overlap_cols = (left_cols & right_cols_to_keep) - set(on_with_left)
-        
-        # Columns unique to each DataFrame
-        left_only_cols = left_cols - right_cols_to_keep - set(on_with_left)
-        right_only_cols = right_cols_to_keep - left_cols - set(on)
-
-        joined = (
-            left_df
-            .sort(*on, left_on)
-            .join_asof(
-                other=right_df.lazy().sort(*on, right_on),
-                left_on=left_on,
-                right_on=right_on,
-                by=by,
-                strategy=strategy,
-                suffix='_updated',
-                check_sortedness=False
+        self.apply(
+            year,
+            [
+                (
+                    "update_asof",
+                    right_df,
+                    {
+                        "left_on": left_on,
+                        "right_on": right_on,
+                        "by": by,
+                        "strategy": strategy,
+                        "drop_right_cols": drop_right_cols,
+                        "dates": dates,
+                    },
+                )
+            ],
+        )
+
+    def on_written(self, callback: Callable[[], None]) -> None:
+        """Run `callback` once pending writes are on disk, which for a table is now."""
+        callback()
+
+    def catalog(self) -> pl.DataFrame:
+        """Statistics of each file of the table, from the database catalog."""
+        return self._catalog.read().filter(pl.col("table").eq(self._name))
+
+    def refresh_catalog(self) -> None:
+        """Catalog files written before the catalog existed or changed since."""
+        entries = self._catalog.entries(self._name)
+        stale = [path for path in self._files() if path not in entries]
+
+        for path in tqdm(stale, desc=f"Cataloging {self._name}"):
+            self._catalog.record(
+                self._name, self._catalog_file(path), pl.read_parquet(path)
             )
+
+    def compact(self, year: int | None = None) -> None:
+        """Fold the daily partitions of completed months into monthly partitions."""
+        if self._partitioning != Partitioning.DATE:
+            return
+
+        current_month = date.today().replace(day=1)
+
+        months = defaultdict(list)
+        for path in self._files(year):
+            partition = Path(path).parent.name
+
+            if partition.startswith("date="):
+                date_ = date.fromisoformat(partition.removeprefix("date="))
+
+                if date_ < current_month:
+                    months[(date_.year, date_.month)].append(path)
+
+        for (month_year, month), paths in sorted(months.items()):
+            month_path = (
+                f"{self._table_path()}/year={month_year}/month={month:02d}/data.parquet"
+            )
+            sources = paths + ([month_path] if os.path.exists(month_path) else [])
+
+            self._write(
+                pl.concat(
+                    [pl.scan_parquet(source) for source in sources],
+                    how="diagonal_relaxed",
+                )
+                .sort(self._ids)
+                .collect(),
+                month_path,
+            )
+
+            self._remove(paths)
+
+    def repartition(self, partitioning: Partitioning) -> None:
+        """Rewrite every file of the table in another layout."""
+        if partitioning == self._partitioning:
+            return
+
+        old_partitioning = self._partitioning
+        old_files = self._files()
+        years = sorted({self._file_year(path) for path in old_files})
+
+        new_files = set()
+
+        for year in years:
+            self._partitioning = old_partitioning
+            df = self.read(year).collect()
+            self._partitioning = partitioning
+
+            paths = (
+                {self._file_path(year): df}
+                if partitioning == Partitioning.YEAR
+                else self._partitions(df)
+            )
+
+            for path, path_df in paths.items():
+                self._write(path_df, path)
+                new_files.add(path)
+
+        with open(f"{self._table_path()}/_partitioning", "w") as file:
+            file.write(partitioning.value)
+
+        self._partitioning = old_partitioning
+        self._remove(sorted(set(old_files) - new_files))
+        self._partitioning = partitioning
+
+        for year_path in glob.glob(f"{self._table_path()}/year=*"):
+            if not os.listdir(year_path):
+                os.rmdir(year_path)
+
+        self.compact()
+
+
+class TableBuilder:
+    """
+    Stage writes to a table and apply them with one write per file.
+
+    Exposes the write methods of `Table`, so flows can write through either.
+    Operations are applied in the order they were staged when `write` is
+    called, except that as-of joins run after the other operations of their
+    year so they see every staged row.
+    """
+
+    def __init__(self, table: Table) -> None:
+        self._table = table
+        self._operations: dict[int, list[Operation]] = defaultdict(list)
+        self._callbacks: list[Callable[[], None]] = []
+
+    def years(self) -> list[int]:
+        return sorted(self._operations)
+
+    def upserted_dates(self) -> list[date]:
+        """Dates of the staged upserts, the only operations that add rows."""
+        return sorted(
+            {
+                date_
+                for operations in self._operations.values()
+                for kind, rows, _ in operations
+                if kind == "upsert"
+                for date_ in rows["date"].drop_nulls().unique()
+            }
         )
-        
-        select_exprs = on_with_left.copy()
-        
-        # Coalesce overlapping columns (prefer right_df)
-        for col in sorted(overlap_cols):
-            select_exprs.append(pl.coalesce(f"{col}_updated", col).alias(col))
-        
-        # Keep left-only columns
-        for col in sorted(left_only_cols):
-            select_exprs.append(pl.col(col))
-        
-        # Keep right-only columns (no suffix added by join)
-        for col in sorted(right_only_cols):
-            select_exprs.append(pl.col(col))
-
-        joined.select(select_exprs).collect().write_parquet(self._file_path(year))
-        
+
+    def exists(self, year: int) -> bool:
+        return self._table.exists(year) or year in self._operations
+
+    def create_if_not_exists(self, year: int) -> None:
+        self._table.create_if_not_exists(year)
+
+    def upsert(self, year: int, rows: pl.DataFrame) -> None:
+        self._operations[year].append(("upsert", rows, {}))
+
+    def update(
+        self, year: int, rows: pl.DataFrame, on: Optional[list[str]] = None
+    ) -> None:
+        self._operations[year].append(("update", rows, {"on": on}))
+
+    def update_asof(self, year: int, right_df: pl.DataFrame, **kwargs) -> None:
+        self._operations[year].append(("update_asof", right_df, kwargs))
+
+    def on_written(self, callback: Callable[[], None]) -> None:
+        """Run `callback` after the staged operations have been written."""
+        self._callbacks.append(callback)
+
+    def write(self, years: list[int] | None = None) -> None:
+        """
+        Write the operations staged for `years`, or for every year.
+
+        Writing some years keeps the rest staged, and the `on_written`
+        callbacks only run once everything is written by a full `write`.
+        """
+        if years is not None:
+            years = sorted(set(years) & set(self._operations))
+
+        for year in tqdm(
+            self.years() if years is None else years,
+            desc=f"Writing {self._table.name}",
+        ):
+            operations = sorted(
+                self._operations[year], key=lambda op: op[0] == "update_asof"
+            )
+            self._table.apply(year, operations)
+            del self._operations[year]
+
+        if years is not None:
+            return
+
+        for callback in self._callbacks:
+            callback()
+
+        self._callbacks.clear()
+
+
+class IntervalTable:
+    """
+    Slowly changing attributes of an asset, one row per validity interval.
+
+    Stored as a single small file of (barrid, start_date, end_date, ...)
+    rows that is rewritten whole, and joined to dated rows at read time.
+    A second file keeps the intervals last materialized into the assets
+    table, which can lag the stored intervals when materializing is skipped.
+    """
+
+    def __init__(
+        self,
+        database: DatabaseName,
+        name: str,
+        schema: dict[str, pl.DataType],
+    ) -> None:
+        self._base_path = database_path(database)
+
+        self._name = name
+        self._schema = schema
+
+        os.makedirs(f"{self._base_path}/{self._name}", exist_ok=True)
+
+    def _file_path(self) -> str:
+        return f"{self._base_path}/{self._name}/{self._name}.parquet"
+
+    def _materialized_path(self) -> str:
+        return f"{self._base_path}/{self._name}/{self._name}_materialized.parquet"
+
+    def _write(self, df: pl.DataFrame, path: str) -> None:
+        temp_path = f"{path}.tmp"
+        df.select(*self._schema).cast(self._schema).write_parquet(temp_path)
+        os.replace(temp_path, path)
+
+    @property
+    def attributes(self) -> list[str]:
+        return [
+            col
+            for col in self._schema
+            if col not in ["barrid", "start_date", "end_date"]
+        ]
+
+    def exists(self) -> bool:
+        return os.path.exists(self._file_path())
+
+    def read(self) -> pl.LazyFrame:
+        if not self.exists():
+            return pl.LazyFrame(schema=self._schema)
+
+        return pl.scan_parquet(self._file_path())
+
+    def write(self, df: pl.DataFrame) -> None:
+        self._write(df, self._file_path())
+
+    def read_materialized(self) -> pl.DataFrame | None:
+        """Intervals last joined into the assets table, None if never."""
+        if not os.path.exists(self._materialized_path()):
+            return None
+
+        return pl.read_parquet(self._materialized_path())
+
+    def write_materialized(self, df: pl.DataFrame) -> None:
+        self._write(df, self._materialized_path())
+
 
 class Database:
     def __init__(self, database_name: DatabaseName):
         self._database_name = database_name
 
+    @property
+    def base_path(self) -> str:
+        return database_path(self._database_name)
+
+    def table(self, name: str) -> Table:
+        return getattr(self, f"{name}_table")
+
+    @property
+    def ingestion_manifest(self) -> IngestionManifest:
+        return IngestionManifest(self.base_path)
+
+    @property
+    def catalog(self) -> Catalog:
+        return Catalog(self.base_path)
+
+    @property
+    def covariance_tensor(self) -> CovarianceTensor:
+        return CovarianceTensor(self.base_path)
+
+    @property
+    def exposures_tensor(self) -> ExposuresTensor:
+        return ExposuresTensor(self.base_path)
+
+    @property
+    def interval_tables(self) -> list[IntervalTable]:
+        return [self.tickers_table, self.cusips_table, self.asset_identity_table]
+
+    def read_assets(
+        self,
+        start: date | None = None,
+        end: date | None = None,
+        columns: list[str] | None = None,
+        barrids: list[str] | None = None,
+    ) -> pl.LazyFrame:
+        """
+        Read the assets table with identity attributes joined from the
+        interval tables.
+
+        Requested identity columns (ticker, cusip, name, ...) are taken from
+        the interval tables with a backward as-of join on date, matching how
+        the identity flows materialize them, instead of from the copies
+        stored in the assets table. Interval tables that were never written
+        fall back to the stored columns. Only the interval tables backing a
+        requested column are joined.
+
+        Args:
+            start: First date to read
+            end: Last date to read
+            columns: Columns to return, defaults to every assets column
+            barrids: Barrids to read, defaults to all
+
+        Returns:
+            LazyFrame with the requested columns
+        """
+        columns = columns or list(self.assets_table.schema)
+
+        joins = [
+            (table, [col for col in table.attributes if col in columns])
+            for table in self.interval_tables
+            if table.exists()
+        ]
+        joins = [(table, attributes) for table, attributes in joins if attributes]
+        joined_columns = {col for _, attributes in joins for col in attributes}
+
+        base_columns = ["date", "barrid"] + [
+            col
+            for col in columns
+            if col not in joined_columns and col not in ["date", "barrid"]
+        ]
+        assets = self.assets_table.read(
+            start=start, end=end, columns=base_columns, barrids=barrids
+        ).sort("barrid", "date")
+
+        for table, attributes in joins:
+            intervals = table.read()
+
+            if barrids is not None:
+                intervals = intervals.filter(pl.col("barrid").is_in(barrids))
+
+            assets = assets.join_asof(
+                intervals.select("barrid", "start_date", *attributes).sort(
+                    "barrid", "start_date"
+                ),
+                left_on="date",
+                right_on="start_date",
+                by="barrid",
+                strategy="backward",
+                check_sortedness=False,
+            ).drop("start_date")
+
+        return assets.select(columns)
+
     @property
     def assets_table(self) -> Table:
         return Table(
@@ -187,6 +875,50 @@ class Database:
             ids=["date", "barrid"],
         )
 
+    @property
+    def tickers_table(self) -> IntervalTable:
+        return IntervalTable(
+            database=self._database_name,
+            name="tickers",
+            schema={
+                "barrid": pl.String,
+                "start_date": pl.Date,
+                "end_date": pl.Date,
+                "ticker": pl.String,
+            },
+        )
+
+    @property
+    def cusips_table(self) -> IntervalTable:
+        return IntervalTable(
+            database=self._database_name,
+            name="cusips",
+            schema={
+                "barrid": pl.String,
+                "start_date": pl.Date,
+                "end_date": pl.Date,
+                "cusip": pl.String,
+            },
+        )
+
+    @property
+    def asset_identity_table(self) -> IntervalTable:
+        return IntervalTable(
+            database=self._database_name,
+            name="asset_identity",
+            schema={
+                "barrid": pl.String,
+                "start_date": pl.Date,
+                "end_date": pl.Date,
+                "rootid": pl.String,
+                "issuerid": pl.String,
+                "instrument": pl.String,
+                "name": pl.String,
+                "iso_country_code": pl.String,
+                "iso_currency_code": pl.String,
+            },
+        )
+
     @property
     def exposures_table(self) -> Table:
         return Table(
@@ -213,6 +945,18 @@ class Database:
             ids=["date", "factor_1"],
         )
 
+    @property
+    def packed_covariances_table(self) -> Table:
+        return Table(
+            database=self._database_name,
+            name="covariances_packed",
+            schema={
+                "date": pl.Date,
+                "covariance": pl.Array(pl.Float64, len(packed_factor_pairs)),
+            },
+            ids=["date"],
+        )
+
     @property
     def crsp_events_table(self) -> Table:
         return Table(
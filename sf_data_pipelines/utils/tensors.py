@@ -0,0 +1,410 @@
+import os
+import numpy as np
+import polars as pl
+from datetime import date
+from pathlib import Path
+from sf_data_pipelines.utils.factors import factors
+
+
+class CovarianceTensor:
+    """
+    Factor covariances as one contiguous memory-mapped (dates, K, K) array.
+
+    The matrices are stored as raw float64 in date order, with a parquet
+    sidecar of (date, index) rows. Reads map the file and slice a date range
+    without copying, so time series of factor risk never touch the tables.
+    Values are in the vendor's units (percent squared).
+
+    The sidecar is written after the data and is authoritative, so bytes
+    past its last date are ignored and trimmed by the next refresh.
+    """
+
+    def __init__(self, base_path: str) -> None:
+        self._data_path = f"{base_path}/_tensors/covariances.f8"
+        self._index_path = f"{base_path}/_tensors/covariances_dates.parquet"
+
+    @property
+    def _matrix_shape(self) -> tuple[int, int]:
+        return len(factors), len(factors)
+
+    @property
+    def _matrix_bytes(self) -> int:
+        return len(factors) ** 2 * np.dtype(np.float64).itemsize
+
+    def exists(self) -> bool:
+        return os.path.exists(self._index_path)
+
+    def dates(self) -> list[date]:
+        if not self.exists():
+            return []
+
+        return pl.read_parquet(self._index_path)["date"].to_list()
+
+    def read(
+        self, start: date | None = None, end: date | None = None
+    ) -> tuple[list[date], np.ndarray]:
+        """
+        Dates and a read-only (T, K, K) view of their matrices.
+
+        Args:
+            start: First date to read
+            end: Last date to read
+
+        Returns:
+            Sorted dates and a memory-mapped view of their matrices
+        """
+        dates = self.dates()
+
+        if not dates:
+            return [], np.empty((0, *self._matrix_shape))
+
+        first = 0 if start is None else np.searchsorted(np.array(dates), start)
+        last = (
+            len(dates)
+            if end is None
+            else np.searchsorted(np.array(dates), end, side="right")
+        )
+
+        tensor = np.memmap(
+            self._data_path,
+            dtype=np.float64,
+            mode="r",
+            shape=(len(dates), *self._matrix_shape),
+        )
+
+        return dates[first:last], tensor[first:last]
+
+    def _write_index(self, dates: list[date]) -> None:
+        # Write then rename so a crash never leaves a truncated index
+        temp_path = Path(f"{self._index_path}.tmp")
+        pl.DataFrame(
+            {"date": dates, "index": range(len(dates))},
+            schema={"date": pl.Date, "index": pl.Int64},
+        ).write_parquet(temp_path)
+        os.replace(temp_path, self._index_path)
+
+    def write(self, dates: list[date], tensor: np.ndarray) -> None:
+        """
+        Store the matrices of `dates`, replacing dates that are already stored.
+
+        Dates after the last stored date are appended and stored dates are
+        overwritten in place. Anything else rewrites the store in date order.
+        """
+        if not dates:
+            return
+
+        os.makedirs(os.path.dirname(self._data_path), exist_ok=True)
+
+        stored = self.dates()
+        positions = {date_: i for i, date_ in enumerate(stored)}
+
+        new = [i for i, date_ in enumerate(dates) if date_ not in positions]
+        existing = [i for i, date_ in enumerate(dates) if date_ in positions]
+
+        if new and stored and min(dates[i] for i in new) <= stored[-1]:
+            _, stored_tensor = self.read()
+            merged = dict(zip(stored, stored_tensor))
+            merged.update(zip(dates, tensor))
+
+            merged_dates = sorted(merged)
+            temp_path = f"{self._data_path}.tmp"
+            np.stack([merged[date_] for date_ in merged_dates]).astype(
+                np.float64
+            ).tofile(temp_path)
+            os.replace(temp_path, self._data_path)
+
+            self._write_index(merged_dates)
+            return
+
+        if existing:
+            stored_tensor = np.memmap(
+                self._data_path,
+                dtype=np.float64,
+                mode="r+",
+                shape=(len(stored), *self._matrix_shape),
+            )
+            stored_tensor[[positions[dates[i]] for i in existing]] = tensor[existing]
+            stored_tensor.flush()
+
+        if new:
+            order = sorted(new, key=lambda i: dates[i])
+
+            with open(self._data_path, "ab") as file:
+                # Drop bytes a crashed append left past the index
+                file.truncate(len(stored) * self._matrix_bytes)
+                tensor[order].astype(np.float64).tofile(file)
+
+            self._write_index(stored + [dates[i] for i in order])
+
+
+class ExposuresTensor:
+    """
+    Factor exposures as memory-mapped (dates, assets, K) chunks, one per year.
+
+    Every barrid gets a stable integer index in order of first appearance,
+    kept in a sidecar, so position i on the asset axis is the same asset in
+    every chunk. A parquet sidecar of (date, index, assets) rows gives each
+    date's position in its year's chunk and the chunk's asset capacity.
+    Chunks reserve room for assets in blocks of `asset_block`, so new
+    listings rarely force a chunk to be rewritten. Cells of assets without
+    exposures on a date are NaN.
+
+    Values are float32, which holds the vendor's precision at half the size.
+    """
+
+    asset_block = 1024
+
+    def __init__(self, base_path: str) -> None:
+        self._path = f"{base_path}/_tensors/exposures"
+        self._barrids_path = f"{self._path}/barrids.parquet"
+        self._index_path = f"{self._path}/dates.parquet"
+
+    def _chunk_path(self, year: int) -> str:
+        return f"{self._path}/year={year}.f4"
+
+    def exists(self) -> bool:
+        return os.path.exists(self._index_path)
+
+    def barrids(self) -> list[str]:
+        if not os.path.exists(self._barrids_path):
+            return []
+
+        return pl.read_parquet(self._barrids_path)["barrid"].to_list()
+
+    def _index(
+        self, start: date | None = None, end: date | None = None
+    ) -> pl.DataFrame:
+        if not self.exists():
+            return pl.DataFrame(
+                schema={"date": pl.Date, "index": pl.Int64, "assets": pl.Int64}
+            )
+
+        index = pl.read_parquet(self._index_path)
+
+        if start is not None:
+            index = index.filter(pl.col("date").ge(start))
+        if end is not None:
+            index = index.filter(pl.col("date").le(end))
+
+        return index
+
+    def dates(self, start: date | None = None, end: date | None = None) -> list[date]:
+        return self._index(start, end)["date"].to_list()
+
+    def _write_parquet(self, df: pl.DataFrame, path: str) -> None:
+        # Write then rename so a crash never leaves a truncated sidecar
+        temp_path = Path(f"{path}.tmp")
+        df.write_parquet(temp_path)
+        os.replace(temp_path, path)
+
+    def _register(self, barrids: list[str]) -> dict[str, int]:
+        """Index every barrid, giving unseen ones the next free positions."""
+        known = self.barrids()
+        new = sorted(set(barrids) - set(known))
+
+        if new:
+            self._write_parquet(
+                pl.DataFrame({"barrid": known + new}, schema={"barrid": pl.String}),
+                self._barrids_path,
+            )
+
+        return {barrid: i for i, barrid in enumerate(known + new)}
+
+    def _indices(self, barrids: list[str]) -> np.ndarray:
+        positions = {barrid: i for i, barrid in enumerate(self.barrids())}
+        missing = [barrid for barrid in barrids if barrid not in positions]
+
+        if missing:
+            raise KeyError(f"Not in the exposures tensor: {missing}")
+
+        return np.array([positions[barrid] for barrid in barrids], dtype=np.int64)
+
+    def _chunk(self, year: int, dates: int, assets: int, mode: str = "r") -> np.memmap:
+        return np.memmap(
+            self._chunk_path(year),
+            dtype=np.float32,
+            mode=mode,
+            shape=(dates, assets, len(factors)),
+        )
+
+    def write(self, df: pl.DataFrame) -> None:
+        """
+        Store the exposures of every date in `df`, replacing stored dates.
+
+        Args:
+            df: Frame of (date, barrid, *factors) rows holding all of the
+                exposures of each of its dates
+        """
+        if df.is_empty():
+            return
+
+        os.makedirs(self._path, exist_ok=True)
+
+        positions = self._register(df["barrid"].unique().to_list())
+        assets = -(-len(positions) // self.asset_block) * self.asset_block
+
+        df = df.with_columns(
+            pl.col("date").dt.year().alias("year"),
+            pl.col("barrid").replace_strict(positions, return_dtype=pl.Int64),
+        )
+
+        index = self._index()
+
+        for (year,), year_df in df.partition_by("year", as_dict=True).items():
+            year_index = self._write_year(
+                year,
+                index.filter(pl.col("date").dt.year().eq(year)),
+                year_df,
+                assets,
+            )
+            index = pl.concat(
+                [index.filter(pl.col("date").dt.year().ne(year)), year_index]
+            )
+
+            self._write_parquet(index.sort("date"), self._index_path)
+
+    def _write_year(
+        self, year: int, index: pl.DataFrame, df: pl.DataFrame, assets: int
+    ) -> pl.DataFrame:
+        """Write the dates of `df` into the chunk of `year` and return its index."""
+        stored = index["date"].to_list()
+        capacity = index["assets"].max() or 0
+
+        dates = df["date"].unique().sort().to_list()
+        date_positions = df.select(
+            pl.col("date").replace_strict(
+                {date_: i for i, date_ in enumerate(dates)}, return_dtype=pl.Int64
+            )
+        )["date"].to_numpy()
+
+        slabs = np.full(
+            (len(dates), df["barrid"].max() + 1, len(factors)),
+            np.nan,
+            dtype=np.float32,
+        )
+        slabs[date_positions, df["barrid"].to_numpy()] = df.select(factors).to_numpy()
+
+        positions = {date_: i for i, date_ in enumerate(stored)}
+        new = [i for i, date_ in enumerate(dates) if date_ not in positions]
+        existing = [i for i, date_ in enumerate(dates) if date_ in positions]
+
+        if slabs.shape[1] > capacity or (
+            new and stored and dates[new[0]] <= stored[-1]
+        ):
+            # Widen the chunk or put its dates back in order
+            merged = sorted(set(stored) | set(dates))
+            merged_positions = {date_: i for i, date_ in enumerate(merged)}
+            capacity = max(capacity, assets)
+
+            temp_path = f"{self._chunk_path(year)}.tmp"
+            chunk = np.memmap(
+                temp_path,
+                dtype=np.float32,
+                mode="w+",
+                shape=(len(merged), capacity, len(factors)),
+            )
+            chunk[:] = np.nan
+
+            if stored:
+                old_chunk = self._chunk(year, len(stored), index["assets"].max())
+                chunk[
+                    [merged_positions[date_] for date_ in stored], : old_chunk.shape[1]
+                ] = old_chunk
+                del old_chunk
+
+            chunk[[merged_positions[date_] for date_ in dates], : slabs.shape[1]] = (
+                slabs
+            )
+            chunk.flush()
+            del chunk
+
+            os.replace(temp_path, self._chunk_path(year))
+            stored = merged
+
+        else:
+            if existing:
+                chunk = self._chunk(year, len(stored), capacity, mode="r+")
+                chunk[[positions[dates[i]] for i in existing], : slabs.shape[1]] = (
+                    slabs[existing]
+                )
+                chunk.flush()
+                del chunk
+
+            if new:
+                appended = np.full(
+                    (len(new), capacity, len(factors)), np.nan, dtype=np.float32
+                )
+                appended[:, : slabs.shape[1]] = slabs[new]
+
+                with open(self._chunk_path(year), "ab") as file:
+                    # Drop bytes a crashed append left past the index
+                    file.truncate(len(stored) * appended[0].nbytes)
+                    appended.tofile(file)
+
+                stored = stored + [dates[i] for i in new]
+
+        return pl.DataFrame(
+            {"date": stored, "index": range(len(stored)), "assets": capacity},
+            schema={"date": pl.Date, "index": pl.Int64, "assets": pl.Int64},
+        )
+
+    def get_exposures(
+        self,
+        start: date | None = None,
+        end: date | None = None,
+        barrids: list[str] | None = None,
+    ) -> np.ndarray:
+        """
+        Exposures of a date range as a (T, N, K) array.
+
+        A range within one year of every asset is a read-only view of the
+        chunk and copies nothing. Ranges across years or a selection of
+        barrids are gathered into a new array.
+
+        Args:
+            start: First date to read
+            end: Last date to read
+            barrids: Assets to read, in order, or every indexed asset
+
+        Returns:
+            Array of the dates in `dates(start, end)` by the assets by
+            `factors`
+        """
+        columns = (
+            np.arange(len(self.barrids()))
+            if barrids is None
+            else self._indices(barrids)
+        )
+        index = self._index().with_columns(pl.col("date").dt.year().alias("year"))
+        chunk_dates = index.group_by("year").len()
+
+        if start is not None:
+            index = index.filter(pl.col("date").ge(start))
+        if end is not None:
+            index = index.filter(pl.col("date").le(end))
+
+        parts = []
+        for (year,), year_index in index.partition_by("year", as_dict=True).items():
+            assets = year_index["assets"][0]
+            chunk = self._chunk(
+                year,
+                chunk_dates.filter(pl.col("year").eq(year))["len"][0],
+                assets,
+            )
+            view = chunk[year_index["index"].min() : year_index["index"].max() + 1]
+
+            if barrids is None and len(columns) <= assets:
+                parts.append(view[:, : len(columns)])
+                continue
+
+            part = np.full(
+                (len(view), len(columns), len(factors)), np.nan, dtype=np.float32
+            )
+            known = columns < assets
+            part[:, known] = view[:, columns[known]]
+            parts.append(part)
+
+        if not parts:
+            return np.empty((0, len(columns), len(factors)), dtype=np.float32)
+
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
@@ -0,0 +1,228 @@
+import connectorx as cx
+import functools
+import os
+import polars as pl
+import time
+import urllib.parse
+from datetime import date, timedelta
+from dotenv import load_dotenv
+from pathlib import Path
+
+WRDS_HOST = "wrds-pgdata.wharton.upenn.edu"
+WRDS_PORT = 9737
+WRDS_DATABASE = "wrds"
+
+# connectorx raises RuntimeError for every failure, so dropped connections
+# and timeouts are told apart from query errors by their message
+transient_errors = [
+    "connect",
+    "closed",
+    "reset by peer",
+    "broken pipe",
+    "unexpected eof",
+    "timed out",
+    "timeout",
+]
+
+
+def pgpass_fields(line: str) -> list[str]:
+    """
+    Fields of a ~/.pgpass line, split on unescaped colons.
+
+    Backslashes escape colons and backslashes, and are removed from the
+    fields. As in libpq, the password runs to the end of the line.
+    """
+    fields, field, escaped = [], [], False
+
+    for char in line:
+        if escaped:
+            field.append(char)
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif char == ":" and len(fields) < 4:
+            fields.append("".join(field))
+            field = []
+        else:
+            field.append(char)
+
+    return [*fields, "".join(field)]
+
+
+def pgpass_password(username: str) -> str | None:
+    """WRDS password saved in ~/.pgpass by `wrds.Connection.create_pgpass_file`."""
+    pgpass_path = Path(os.getenv("PGPASSFILE") or Path.home() / ".pgpass")
+
+    if not pgpass_path.exists():
+        return None
+
+    for line in pgpass_path.read_text().splitlines():
+        if line.startswith("#"):
+            continue
+
+        fields = pgpass_fields(line)
+
+        if len(fields) != 5:
+            continue
+
+        *keys, password = fields
+        if all(
+            key in ("*", value)
+            for key, value in zip(
+                keys, [WRDS_HOST, str(WRDS_PORT), WRDS_DATABASE, username]
+            )
+        ):
+            return password
+
+    return None
+
+
+def wrds_uri() -> str:
+    """
+    Connection URI of the WRDS Postgres server.
+
+    WRDS_URI replaces the server with a stand-in, such as
+    postgresql://localhost:5432/wrds or sqlite:///tmp/wrds.db. Otherwise
+    the password is read from WRDS_PASSWORD or ~/.pgpass, and TCP
+    keep-alives stop idle connections from being dropped mid-backfill.
+    """
+    load_dotenv(override=True)
+
+    if uri := os.getenv("WRDS_URI"):
+        return uri
+
+    username = os.getenv("WRDS_USERNAME", "amh1124")
+    password = os.getenv("WRDS_PASSWORD") or pgpass_password(username)
+
+    if password is None:
+        raise RuntimeError(
+            "No WRDS password found. Set WRDS_PASSWORD or save one with "
+            "wrds.Connection().create_pgpass_file()."
+        )
+
+    # Quote the credentials so characters like @, : or / survive the URI
+    username = urllib.parse.quote(username, safe="")
+    password = urllib.parse.quote(password, safe="")
+
+    return (
+        f"postgresql://{username}:{password}@{WRDS_HOST}:{WRDS_PORT}/"
+        f"{WRDS_DATABASE}?sslmode=require&keepalives=1&keepalives_idle=30"
+    )
+
+
+def is_transient(error: Exception) -> bool:
+    """Whether a failed read was a dropped connection or a timeout."""
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+
+    message = str(error).lower()
+    return any(pattern in message for pattern in transient_errors)
+
+
+def date_ranges(start_date: date, end_date: date, n: int) -> list[tuple[date, date]]:
+    """Split [start_date, end_date] into at most `n` contiguous date ranges."""
+    days = (end_date - start_date).days + 1
+    n = max(1, min(n, days))
+    bounds = [start_date + timedelta(days=days * i // n) for i in range(n + 1)]
+
+    return [(bounds[i], bounds[i + 1] - timedelta(days=1)) for i in range(n)]
+
+
+class WrdsReader:
+    """
+    Reads WRDS queries straight into Polars through connectorx.
+
+    Results are built as Arrow on the client, with no pandas round trip.
+    A query can be split server-side on an integer column, which connectorx
+    breaks into ranges between its min and max, or on date ranges. The
+    pieces run over `partitions` parallel connections.
+
+    Credentials are resolved once per reader, so flows that share a reader
+    read ~/.pgpass once, but connectorx opens and authenticates new
+    connections on every read; the keep-alives only protect the connections
+    of a long-running query. A read that fails on a dropped connection or a
+    timeout is retried up to `retries` times with backoff. Other failures,
+    such as SQL errors, are raised at once.
+
+    SQLite has no schemas, so an SQLite stand-in names the table
+    schema.table as schema_table; queries get names through `table`.
+    """
+
+    def __init__(
+        self, uri: str | None = None, partitions: int = 4, retries: int = 3
+    ) -> None:
+        self.uri = uri or wrds_uri()
+        self.partitions = partitions
+        self.retries = retries
+
+    def table(self, schema: str, name: str) -> str:
+        if self.uri.startswith("sqlite"):
+            return f"{schema}_{name}"
+
+        return f"{schema}.{name}"
+
+    def read(
+        self,
+        query: str | list[str],
+        schema: dict[str, pl.DataType] | None = None,
+        partition_on: str | None = None,
+    ) -> pl.DataFrame:
+        """
+        Run `query`, or every query of a list in parallel, into one frame.
+
+        Args:
+            query: SQL query without a trailing semicolon, or a list of them
+            schema: Types to cast the result columns to
+            partition_on: Integer column to split the query on
+
+        Returns:
+            The result, with the columns in `schema` cast to its types
+        """
+        kwargs = (
+            {"partition_on": partition_on, "partition_num": self.partitions}
+            if partition_on is not None and self.partitions > 1
+            else {}
+        )
+        for attempt in range(self.retries + 1):
+            try:
+                df = cx.read_sql(self.uri, query, return_type="polars", **kwargs)
+                break
+            except (RuntimeError, ConnectionError, TimeoutError) as error:
+                if attempt == self.retries or not is_transient(error):
+                    raise
+
+                time.sleep(2**attempt)
+
+        if schema is not None:
+            df = df.cast({col: schema[col] for col in df.columns if col in schema})
+
+        return df
+
+    def read_date_ranges(
+        self,
+        query: str,
+        start_date: date,
+        end_date: date,
+        schema: dict[str, pl.DataType] | None = None,
+    ) -> pl.DataFrame:
+        """
+        Run `query` over date ranges of [start_date, end_date] in parallel.
+
+        Args:
+            query: SQL query with {start_date} and {end_date} placeholders
+            start_date: First date to read
+            end_date: Last date to read
+            schema: Types to cast the result columns to
+        """
+        queries = [
+            query.format(start_date=start, end_date=end)
+            for start, end in date_ranges(start_date, end_date, self.partitions)
+        ]
+
+        return self.read(queries if len(queries) > 1 else queries[0], schema)
+
+
+@functools.cache
+def shared_wrds_reader() -> WrdsReader:
+    """Reader shared by every WRDS flow in the process."""
+    return WrdsReader()
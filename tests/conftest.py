@@ -0,0 +1,20 @@
+import os
+
+# The Barra datasets resolve their archive paths from ROOT on import
+os.environ.setdefault("ROOT", "/tmp/sf_data_pipelines/archive")
+
+import pytest
+from sf_data_pipelines.utils import tables
+from sf_data_pipelines.utils.enums import DatabaseName
+from sf_data_pipelines.utils.tables import Database
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch) -> Database:
+    """Development database rooted in a temporary directory."""
+    monkeypatch.setattr(
+        tables, "database_path", lambda name: str(tmp_path / "database" / name.value)
+    )
+    monkeypatch.delenv("BARRA_CACHE_DIR", raising=False)
+
+    return Database(DatabaseName.DEVELOPMENT)
@@ -0,0 +1,85 @@
+import datetime as dt
+import zipfile
+import polars as pl
+import pytest
+from sf_data_pipelines.barra_returns_flow import barra_returns_daily_flow
+from sf_data_pipelines.barra_volume_flow import barra_volume_daily_flow
+from sf_data_pipelines.utils.barra_datasets import barra_returns, barra_volume
+from sf_data_pipelines.utils.ingestion import DailyIngestion
+from sf_data_pipelines.utils.tables import TableBuilder
+
+dates = [dt.date(2026, 10, 14), dt.date(2026, 10, 15)]
+
+
+@pytest.fixture
+def archive(tmp_path, monkeypatch):
+    for dataset in [barra_returns, barra_volume]:
+        monkeypatch.setattr(dataset, "_base_path", tmp_path / "archive")
+
+    return tmp_path / "archive"
+
+
+def write_zip(dataset, date_, header, rows):
+    path = dataset.daily_zip_folder_path(date_)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    lines = ["Header"] * dataset.skip_rows + [header, *rows, "[End of File]"]
+    with zipfile.ZipFile(path, "w") as zip_folder:
+        zip_folder.writestr(dataset.file_name(date_), "\n".join(lines))
+
+
+def write_returns(date_):
+    write_zip(
+        barra_returns,
+        date_,
+        "!Barrid|Price|Capt|PriceSource|Currency|DlyReturn%|DataDate",
+        [f"USA0001|10.0|1000.0|NYSE|USD|0.5|{date_:%Y%m%d}"],
+    )
+
+
+def write_volume(date_):
+    write_zip(
+        barra_volume,
+        date_,
+        "!Barrid|DataDate|DailyVolume|ADTV_30|ADTV_60|ADTV_90"
+        "|BidAskSpread|ADBAS_30|ADBAS_60|ADBAS_90",
+        [f"USA0001|{date_:%Y%m%d}|500.0|1.0|1.0|1.0|0.1|0.1|0.1|0.1"],
+    )
+
+
+def run_daily(database):
+    ingestion = DailyIngestion(dates, manifest=database.ingestion_manifest)
+    ingestion.register(barra_returns)
+    ingestion.register(barra_volume, target=database.assets_table)
+    ingestion.run()
+
+    builder = TableBuilder(database.assets_table)
+    barra_returns_daily_flow(database, ingestion.pop(barra_returns), builder)
+    barra_volume_daily_flow(database, ingestion.pop(barra_volume), builder)
+    builder.write()
+
+    ingestion.commit()
+
+
+def test_update_dataset_waits_for_its_target_rows(database, archive):
+    write_returns(dates[0])
+    write_volume(dates[0])
+
+    # Volume for the second date lands a run before its returns
+    write_volume(dates[1])
+    run_daily(database)
+
+    assert dates[1] not in database.ingestion_manifest.loaded(barra_volume)
+
+    write_returns(dates[1])
+    run_daily(database)
+
+    assets = (
+        database.assets_table.read(columns=["date", "barrid", "daily_volume"])
+        .sort("date")
+        .collect()
+    )
+
+    assert assets["date"].to_list() == dates
+    assert assets["daily_volume"].to_list() == [500.0, 500.0]
+    assert dates[1] in database.ingestion_manifest.loaded(barra_volume)
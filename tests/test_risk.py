@@ -0,0 +1,71 @@
+import datetime as dt
+import polars as pl
+import pytest
+from sf_data_pipelines.utils.factors import factors
+from sf_data_pipelines.utils.risk import portfolio_risk
+
+date_ = dt.date(2026, 10, 15)
+
+
+@pytest.fixture
+def risk_database(database):
+    database.covariances_table.create_if_not_exists(date_.year)
+    database.covariances_table.upsert(
+        date_.year,
+        pl.DataFrame(
+            {
+                "date": [date_] * len(factors),
+                "factor_1": factors,
+                **{
+                    factor: [100.0 if factor == row else 0.0 for row in factors]
+                    for factor in factors
+                },
+            }
+        ),
+    )
+
+    # USA0002 has no exposures and USA0003 has no specific risk
+    database.exposures_table.create_if_not_exists(date_.year)
+    database.exposures_table.upsert(
+        date_.year,
+        pl.DataFrame(
+            {
+                "date": [date_, date_],
+                "barrid": ["USA0001", "USA0003"],
+                **{factor: [1.0, 1.0] for factor in factors[:1]},
+            }
+        ),
+    )
+
+    database.assets_table.create_if_not_exists(date_.year)
+    database.assets_table.upsert(
+        date_.year,
+        pl.DataFrame(
+            {
+                "date": [date_, date_],
+                "barrid": ["USA0001", "USA0002"],
+                "specific_risk": [20.0, 30.0],
+            }
+        ),
+    )
+
+    return database
+
+
+def test_portfolio_risk_reports_uncovered_weight(risk_database):
+    weights = pl.DataFrame(
+        {
+            "date": [date_] * 4,
+            "barrid": ["USA0001", "USA0002", "USA0003", "USA0001"],
+            "signal": ["a", "a", "a", "b"],
+            "weight": [0.5, 0.3, -0.2, 1.0],
+        }
+    )
+
+    risk = portfolio_risk(risk_database, weights)
+
+    assert risk["uncovered_weight"].to_list() == pytest.approx([0.5, 0.0])
+    assert risk["factor_risk"].to_list() == pytest.approx([0.03, 0.1])
+    assert risk["specific_risk"].to_list() == pytest.approx(
+        [(0.1**2 + 0.09**2) ** 0.5, 0.2]
+    )
@@ -0,0 +1,79 @@
+import pytest
+from sf_data_pipelines.utils import wrds_reader
+from sf_data_pipelines.utils.wrds_reader import WrdsReader, pgpass_fields, pgpass_password
+
+
+def test_pgpass_fields_unescape_colons_and_backslashes():
+    assert pgpass_fields(r"host:5432:db:user:pa\:ss\\word") == [
+        "host",
+        "5432",
+        "db",
+        "user",
+        "pa:ss\\word",
+    ]
+    assert pgpass_fields(r"host\:name:5432:db:user:a:b") == [
+        "host:name",
+        "5432",
+        "db",
+        "user",
+        "a:b",
+    ]
+
+
+@pytest.fixture
+def pgpass(tmp_path, monkeypatch):
+    path = tmp_path / ".pgpass"
+    monkeypatch.setenv("PGPASSFILE", str(path))
+
+    return path
+
+
+def test_pgpass_password_with_colon(pgpass):
+    pgpass.write_text(
+        "# WRDS\n"
+        "wrds-pgdata.wharton.upenn.edu:9737:wrds:other:wrong\n"
+        r"wrds-pgdata.wharton.upenn.edu:9737:wrds:user:se\:cr\\et" + "\n"
+    )
+
+    assert pgpass_password("user") == "se:cr\\et"
+    assert pgpass_password("missing") is None
+
+
+def test_pgpass_password_wildcards(pgpass):
+    pgpass.write_text("*:*:wrds:user:secret\n")
+
+    assert pgpass_password("user") == "secret"
+
+
+@pytest.fixture
+def failing_read_sql(monkeypatch):
+    calls = []
+
+    def fail_with(message):
+        def read_sql(*args, **kwargs):
+            calls.append(message)
+            raise RuntimeError(message)
+
+        monkeypatch.setattr(wrds_reader.cx, "read_sql", read_sql)
+        return calls
+
+    monkeypatch.setattr(wrds_reader.time, "sleep", lambda seconds: None)
+    return fail_with
+
+
+def test_read_retries_dropped_connections(failing_read_sql):
+    calls = failing_read_sql("server closed the connection unexpectedly")
+
+    with pytest.raises(RuntimeError):
+        WrdsReader("postgresql://localhost/wrds", retries=2).read("select 1")
+
+    assert len(calls) == 3
+
+
+def test_read_raises_query_errors_at_once(failing_read_sql):
+    calls = failing_read_sql('db error: ERROR: relation "crsp.dsf" does not exist')
+
+    with pytest.raises(RuntimeError):
+        WrdsReader("postgresql://localhost/wrds", retries=2).read("select 1")
+
+    assert len(calls) == 1